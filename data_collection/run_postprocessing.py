@@ -1,135 +1,192 @@
 import json
+import mmap
+import os
 import struct
+from collections import defaultdict
+from functools import partial
+from operator import itemgetter
 from pathlib import Path
 from uuid import UUID
 
 import psutil
 from normalization import clean_str
-from rich.progress import track
 
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024  # 8MB file buffer for the metadata binary
+LINE_COUNT_BLOCK_SIZE = 16 * 1024 * 1024  # 16MB blocks for newline counting
+PROGRESS_INTERVAL = 100000  # Lines/entries between progress prints in hot loops
 
-def _build_binary_entry(artist_id_str: str, connections: list) -> tuple[bytearray | None, int, str]:
-    """Build binary entry for a single artist. Returns (entry_data, valid_connections, artist_id_str)."""
-    try:
-        artist_uuid = UUID(artist_id_str)
-        artist_bytes = artist_uuid.bytes
-    except ValueError:
-        return None, 0, artist_id_str
+UUID_HEX_LENGTH = 32
+UUID_BYTES_LENGTH = 16
 
-    entry_data = bytearray()
-    entry_data.extend(artist_bytes)  # 16 bytes
-    entry_data.extend(struct.pack("<I", len(connections)))  # 4 bytes (will be updated if needed)
+ENTRY_HEADER_SIZE = 20  # UUID (16 bytes) + connection count (4 bytes)
+CONNECTION_SIZE = 20  # UUID (16 bytes) + weight (4 bytes)
 
-    # Process connections with minimal UUID parsing
-    valid_connections = 0
-    for conn_id, weight in connections:
+_ENTRY_HEADER_STRUCT = struct.Struct("<16sI")
+_CONNECTION_STRUCT = struct.Struct("<16sf")
+
+_PROCESS = psutil.Process()  # Reused for RSS reads in progress reports
+
+
+def _uuid_bytes(uuid_str: str) -> bytes:
+    """Decode UUID string to 16 bytes. Falls back to UUID() so malformed ids raise ValueError."""
+    hex_str = uuid_str.replace("-", "")
+    if len(hex_str) == UUID_HEX_LENGTH:
         try:
-            conn_uuid_bytes = UUID(conn_id).bytes
-            entry_data.extend(conn_uuid_bytes)  # 16 bytes
-            entry_data.extend(struct.pack("<f", weight))  # 4 bytes
-            valid_connections += 1
+            raw = bytes.fromhex(hex_str)
         except ValueError:
-            continue  # Skip invalid UUIDs
+            raw = b""
+        if len(raw) == UUID_BYTES_LENGTH:
+            return raw
+    return UUID(uuid_str).bytes
+
+
+def _cached_uuid_bytes(uuid_str: str, uuid_cache: dict[str, bytes]) -> bytes:
+    """Decode UUID string to bytes, parsing each distinct id only once across the pipeline."""
+    uuid_bytes = uuid_cache.get(uuid_str)
+    if uuid_bytes is None:
+        uuid_bytes = _uuid_bytes(uuid_str)
+        uuid_cache[uuid_str] = uuid_bytes
+    return uuid_bytes
+
+
+def _count_lines(path: Path) -> int:
+    """Count lines by scanning raw bytes in large blocks instead of iterating lines in Python."""
+    line_count = 0
+    last_byte = b"\n"
+    with path.open("rb") as f:
+        for block in iter(partial(f.read, LINE_COUNT_BLOCK_SIZE), b""):
+            line_count += block.count(b"\n")
+            last_byte = block[-1:]
+    # Count a final line without trailing newline
+    return line_count + (last_byte != b"\n")
+
+
+def _open_mapped_output(path: Path, size: int) -> tuple[int, mmap.mmap]:
+    """Create output file preallocated to size bytes and map it for writing."""
+    size = max(size, 1)  # mmap can't map an empty file
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        os.ftruncate(fd, size)  # No fallocate on this platform/filesystem - sparse file is fine
+    return fd, mmap.mmap(fd, size)
 
-    # Update connection count if some UUIDs were invalid
-    if valid_connections != len(connections):
-        struct.pack_into("<I", entry_data, 16, valid_connections)
 
-    return entry_data, valid_connections, artist_id_str
+def _close_mapped_output(fd: int, out: mmap.mmap, final_size: int) -> None:
+    """Unmap output file and trim it to the bytes actually written."""
+    out.close()
+    os.ftruncate(fd, final_size)
+    os.close(fd)
 
 
-def _flush_buffer_if_needed(
-    write_buffer: bytearray,
-    outfile,
+def _ensure_capacity(out: mmap.mmap, required: int) -> None:
+    """Grow mapped output if an entry would not fit (size estimates are upper bounds)."""
+    if required > len(out):
+        out.resize(max(required, len(out) * 2))
+
+
+def _build_binary_entry(
+    out: mmap.mmap,
     position: int,
-    buffer_size: int,
-    processed_lines: int,
-) -> int:
-    """Flush write buffer if it's full and return new position."""
-    if len(write_buffer) >= buffer_size:
-        outfile.write(write_buffer)
-        new_position = position + len(write_buffer)
-        write_buffer.clear()
+    artist_bytes: bytes,
+    connections: list,
+    uuid_cache: dict[str, bytes],
+) -> tuple[int, int]:
+    """Write binary entry for a single artist at position. Returns (end_position, valid_connections)."""
+    _ensure_capacity(out, position + ENTRY_HEADER_SIZE + CONNECTION_SIZE * len(connections))
 
-        # Memory check
-        memory_mb = psutil.Process().memory_info().rss / (1024 * 1024)
-        if processed_lines % 100000 == 0:
-            print(f"   Memory: {memory_mb:.0f}MB, processed {processed_lines:,} lines")
+    # Process connections with minimal UUID parsing
+    valid_connections = 0
+    cursor = position + ENTRY_HEADER_SIZE
+    pack_connection = _CONNECTION_STRUCT.pack_into
+    for conn_id, weight in connections:
+        try:
+            conn_uuid_bytes = _cached_uuid_bytes(conn_id, uuid_cache)
+        except ValueError:
+            continue  # Skip invalid UUIDs
+        pack_connection(out, cursor, conn_uuid_bytes, weight)  # 20 bytes
+        cursor += CONNECTION_SIZE
+        valid_connections += 1
+
+    # Header goes last so the count reflects skipped invalid UUIDs
+    _ENTRY_HEADER_STRUCT.pack_into(out, position, artist_bytes, valid_connections)
 
-        return new_position
-    return position
+    return cursor, valid_connections
 
 
-def convert_graph_to_binary(graph_file: Path | str, line_count: int | None = None) -> dict:
+def convert_graph_to_binary(
+    graph_file: Path | str,
+    line_count: int | None = None,
+    uuid_cache: dict[str, bytes] | None = None,
+) -> dict:
     """Convert NDJSON graph to binary format with index for faster loading."""
     graph_path = Path(graph_file)
     binary_path = Path("../data/graph.bin")
 
+    if uuid_cache is None:
+        uuid_cache = {}
+
     index = {}
     total_artists = 0
     total_connections = 0
 
-    # Buffer for batched writes
-    write_buffer = bytearray()
-    buffer_size = 8 * 1024 * 1024  # 8MB buffer
-
     # Count lines only if not provided
     if line_count is None:
         print(f"📊 Counting lines in {graph_path.name}...")
-        with graph_path.open() as f:
-            line_count = sum(1 for line in f if line.strip())
+        line_count = _count_lines(graph_path)
         print(f"   Found {line_count:,} lines to process")
 
-    with graph_path.open() as infile, binary_path.open("wb") as outfile:
-        position = 0
-        processed_lines = 0
+    # Binary entries are never larger than their JSON lines (20 bytes per connection
+    # vs a quoted UUID plus weight), so the input size bounds the output size
+    fd, outfile = _open_mapped_output(binary_path, graph_path.stat().st_size)
+    position = 0
 
-        for line_ in track(
-            infile,
-            total=line_count,
-            description="[green]Converting graph to binary...",
-        ):
-            line = line_.strip()
-            if not line:
-                continue
+    try:
+        with graph_path.open("rb") as infile:
+            processed_lines = 0
 
-            try:
-                data = json.loads(line)
-                artist_id_str = data["id"]
-                connections = data["connections"]
-
-                # Build binary entry
-                entry_data, valid_connections, _ = _build_binary_entry(artist_id_str, connections)
-                if entry_data is None:
-                    print(f"⚠️  Invalid UUID: {artist_id_str}")
+            for line in infile:
+                if line.isspace():
                     continue
 
-                # Store byte position for this artist in index
-                index[artist_id_str] = position + len(write_buffer)
-
-                # Add to buffer
-                write_buffer.extend(entry_data)
-                total_artists += 1
-                total_connections += valid_connections
-
-                # Flush buffer if needed
-                position = _flush_buffer_if_needed(
-                    write_buffer,
-                    outfile,
-                    position,
-                    buffer_size,
-                    processed_lines,
-                )
-
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"⚠️  Skipping malformed line: {e}")
-                continue
-
-            processed_lines += 1
+                try:
+                    data = json.loads(line)
+                    artist_id_str = data["id"]
+                    connections = data["connections"]
+
+                    try:
+                        artist_bytes = _cached_uuid_bytes(artist_id_str, uuid_cache)
+                    except ValueError:
+                        print(f"⚠️  Invalid UUID: {artist_id_str}")
+                        continue
+
+                    # Store byte position for this artist in index
+                    index[artist_id_str] = position
+
+                    # Write entry straight into the mapped file
+                    position, valid_connections = _build_binary_entry(
+                        outfile,
+                        position,
+                        artist_bytes,
+                        connections,
+                        uuid_cache,
+                    )
+                    total_artists += 1
+                    total_connections += valid_connections
+
+                except (json.JSONDecodeError, KeyError) as e:
+                    print(f"⚠️  Skipping malformed line: {e}")
+                    continue
 
-        # Write final buffer
-        if write_buffer:
-            outfile.write(write_buffer)
+                processed_lines += 1
+                if processed_lines % PROGRESS_INTERVAL == 0:
+                    memory_mb = _PROCESS.memory_info().rss / (1024 * 1024)
+                    print(
+                        f"   Memory: {memory_mb:.0f}MB, "
+                        f"processed {processed_lines:,}/{line_count:,} lines",
+                    )
+    finally:
+        _close_mapped_output(fd, outfile, position)
 
     return {
         "artists": total_artists,
@@ -142,16 +199,16 @@ def convert_graph_to_binary(graph_file: Path | str, line_count: int | None = Non
 def build_lookup(metadata_file: Path | str) -> dict:
     """Build clean name lookup dictionary from NDJSON metadata file."""
     metadata_path = Path(metadata_file)
-    lookup = {}
+    lookup: defaultdict[str, list[str]] = defaultdict(list)
 
-    with metadata_path.open() as f:
-        # Get total for progress bar
-        total = sum(1 for _ in f)
-        f.seek(0)
+    # Get total for progress output
+    total = _count_lines(metadata_path)
 
-        # Process with progress bar
-        for line in track(f, description="[green]Building lookup...", total=total):
-            if not line.strip():
+    with metadata_path.open("rb") as f:
+        for line_num, line in enumerate(f, 1):
+            if line_num % PROGRESS_INTERVAL == 0:
+                print(f"   Building lookup: {line_num:,}/{total:,} lines")
+            if line.isspace():
                 continue
 
             entry = json.loads(line)
@@ -159,10 +216,7 @@ def build_lookup(metadata_file: Path | str) -> dict:
             name = entry["name"]
 
             # Build clean name lookup - store lists of artists
-            clean_name = clean_str(name)
-            if clean_name not in lookup:
-                lookup[clean_name] = []
-            lookup[clean_name].append(mbid)
+            lookup[clean_str(name)].append(mbid)
 
     return lookup
 
@@ -172,19 +226,24 @@ def create_unified_metadata_binary(
     lookup: dict,
     forward_index: dict,
     reverse_index: dict | None = None,
+    uuid_cache: dict[str, bytes] | None = None,
 ) -> dict:
     """Create a single binary file with lookup, metadata, forward index, and reverse index."""
     metadata_path = Path(metadata_file)
     binary_path = Path("../data/metadata.bin")
 
+    if uuid_cache is None:
+        uuid_cache = {}
+
     # Parse metadata into memory first
     metadata = {}
-    with metadata_path.open() as f:
-        total = sum(1 for _ in f)
-        f.seek(0)
+    total = _count_lines(metadata_path)
 
-        for line in track(f, description="[green]Loading metadata...", total=total):
-            if not line.strip():
+    with metadata_path.open("rb") as f:
+        for line_num, line in enumerate(f, 1):
+            if line_num % PROGRESS_INTERVAL == 0:
+                print(f"   Loading metadata: {line_num:,}/{total:,} lines")
+            if line.isspace():
                 continue
             entry = json.loads(line)
             metadata[entry["id"]] = {"name": entry["name"], "url": entry["url"]}
@@ -193,7 +252,7 @@ def create_unified_metadata_binary(
     if reverse_index is None:
         reverse_index = {}
 
-    with binary_path.open("wb") as f:
+    with binary_path.open("wb", buffering=WRITE_BUFFER_SIZE) as f:
         # Header: 4 uint32 values for section offsets
         header_pos = f.tell()
         f.write(struct.pack("<IIII", 0, 0, 0, 0))  # Placeholders for section offsets
@@ -202,20 +261,22 @@ def create_unified_metadata_binary(
         lookup_offset = f.tell()
         f.write(struct.pack("<I", len(lookup)))  # Number of entries
 
-        for clean_name, uuid_list in track(lookup.items(), description="[green]Writing lookup..."):
+        print(f"   Writing lookup ({len(lookup):,} entries)...")
+        for clean_name, uuid_list in lookup.items():
             name_bytes = clean_name.encode("utf-8")
             f.write(struct.pack("<H", len(name_bytes)))  # Name length (2 bytes)
             f.write(name_bytes)  # Name
             f.write(struct.pack("<H", len(uuid_list)))  # Number of UUIDs (2 bytes)
             for uuid_str in uuid_list:
-                f.write(UUID(uuid_str).bytes)  # UUID (16 bytes)
+                f.write(_cached_uuid_bytes(uuid_str, uuid_cache))  # UUID (16 bytes)
 
         # Section 2: Metadata (UUID -> name + url)
         metadata_offset = f.tell()
         f.write(struct.pack("<I", len(metadata)))  # Number of entries
 
-        for uuid_str, data in track(metadata.items(), description="[green]Writing metadata..."):
-            f.write(UUID(uuid_str).bytes)  # UUID (16 bytes)
+        print(f"   Writing metadata ({len(metadata):,} entries)...")
+        for uuid_str, data in metadata.items():
+            f.write(_cached_uuid_bytes(uuid_str, uuid_cache))  # UUID (16 bytes)
 
             name_bytes = data["name"].encode("utf-8")
             url_bytes = data["url"].encode("utf-8")
@@ -229,22 +290,18 @@ def create_unified_metadata_binary(
         forward_index_offset = f.tell()
         f.write(struct.pack("<I", len(forward_index)))  # Number of entries
 
-        for uuid_str, position in track(
-            forward_index.items(),
-            description="[green]Writing forward index...",
-        ):
-            f.write(UUID(uuid_str).bytes)  # UUID (16 bytes)
+        print(f"   Writing forward index ({len(forward_index):,} entries)...")
+        for uuid_str, position in forward_index.items():
+            f.write(_cached_uuid_bytes(uuid_str, uuid_cache))  # UUID (16 bytes)
             f.write(struct.pack("<Q", position))  # Position (8 bytes, uint64)
 
         # Section 4: Reverse graph index (UUID -> file position in rev-graph.bin)
         reverse_index_offset = f.tell()
         f.write(struct.pack("<I", len(reverse_index)))  # Number of entries
 
-        for uuid_str, position in track(
-            reverse_index.items(),
-            description="[green]Writing reverse index...",
-        ):
-            f.write(UUID(uuid_str).bytes)  # UUID (16 bytes)
+        print(f"   Writing reverse index ({len(reverse_index):,} entries)...")
+        for uuid_str, position in reverse_index.items():
+            f.write(_cached_uuid_bytes(uuid_str, uuid_cache))  # UUID (16 bytes)
             f.write(struct.pack("<Q", position))  # Position (8 bytes, uint64)
 
         # Update header with section offsets
@@ -270,7 +327,7 @@ def create_unified_metadata_binary(
     }
 
 
-def _process_graph_line_for_reverse(line: str, reverse_connections: dict) -> int:
+def _process_graph_line_for_reverse(line: bytes, reverse_connections: dict) -> int:
     """Process a single graph line and add reverse connections. Returns number of connections added."""
     connections_added = 0
 
@@ -280,8 +337,6 @@ def _process_graph_line_for_reverse(line: str, reverse_connections: dict) -> int
 
         for target_id, similarity in data["connections"]:
             # Always add to current chunk (don't skip processed artists here!)
-            if target_id not in reverse_connections:
-                reverse_connections[target_id] = []
             reverse_connections[target_id].append((source_id, similarity))
             connections_added += 1
 
@@ -294,33 +349,34 @@ def _process_graph_line_for_reverse(line: str, reverse_connections: dict) -> int
 # Removed chunking functions - now using simpler collect-all-then-write approach
 
 
-def build_reverse_graph_binary(graph_file: Path, line_count: int | None = None) -> dict:
+def build_reverse_graph_binary(
+    graph_file: Path,
+    line_count: int | None = None,
+    uuid_cache: dict[str, bytes] | None = None,
+) -> dict:
     """Build reverse graph from forward graph - collect ALL connections then write."""
     reverse_binary_path = Path("../data/rev-graph.bin")
 
+    if uuid_cache is None:
+        uuid_cache = {}
+
     # Collect ALL reverse connections in memory first
-    reverse_connections = {}  # target_id -> list of (source_id, similarity)
+    reverse_connections = defaultdict(list)  # target_id -> list of (source_id, similarity)
     total_connections = 0
 
     # Count lines only if not provided
     if line_count is None:
         print(f"📊 Counting lines in {graph_file.name}...")
-        with graph_file.open() as f:
-            line_count = sum(1 for line in f if line.strip())
+        line_count = _count_lines(graph_file)
         print(f"   Found {line_count:,} lines to process")
 
     print("📊 Building complete reverse graph in memory...")
 
-    with graph_file.open() as f:
+    with graph_file.open("rb") as f:
         processed_lines = 0
 
-        for line_ in track(
-            f,
-            total=line_count,
-            description="[green]Collecting reverse connections...",
-        ):
-            line = line_.strip()
-            if not line:
+        for line in f:
+            if line.isspace():
                 continue
 
             # Process this line
@@ -329,43 +385,58 @@ def build_reverse_graph_binary(graph_file: Path, line_count: int | None = None)
 
             processed_lines += 1
             if processed_lines % 200000 == 0:
-                print(f"   Processed {processed_lines:,} lines, {total_connections:,} connections")
+                print(
+                    f"   Processed {processed_lines:,}/{line_count:,} lines, "
+                    f"{total_connections:,} connections",
+                )
                 print(f"   Unique reverse artists so far: {len(reverse_connections):,}")
 
                 # Memory check
-                memory_mb = psutil.Process().memory_info().rss / (1024 * 1024)
+                memory_mb = _PROCESS.memory_info().rss / (1024 * 1024)
                 print(f"   Memory usage: {memory_mb:.0f}MB")
 
     print(f"📊 Writing {len(reverse_connections):,} artists to binary...")
 
-    # Write everything to binary
+    # Write everything to binary - exact size is known up front
     rev_index = {}
-    with reverse_binary_path.open("wb") as outfile:
-        for target_id, connections in track(
-            reverse_connections.items(),
-            description="[green]Writing reverse graph binary...",
-        ):
-            try:
-                artist_id = UUID(target_id)
-
-                # Sort by similarity (highest first)
-                connections.sort(key=lambda x: x[1], reverse=True)
-
-                # Store byte position for this artist in index
-                rev_index[target_id] = outfile.tell()
+    output_size = sum(
+        ENTRY_HEADER_SIZE + CONNECTION_SIZE * len(connections)
+        for connections in reverse_connections.values()
+    )
+    fd, outfile = _open_mapped_output(reverse_binary_path, output_size)
+    position = 0
 
-                # Write binary format
-                outfile.write(artist_id.bytes)  # 16 bytes
-                outfile.write(struct.pack("<I", len(connections)))  # 4 bytes
+    try:
+        for written, (target_id, connections) in enumerate(reverse_connections.items(), 1):
+            if written % PROGRESS_INTERVAL == 0:
+                print(f"   Written {written:,}/{len(reverse_connections):,} artists")
 
-                for source_id, weight in connections:
-                    outfile.write(UUID(source_id).bytes)  # 16 bytes
-                    outfile.write(struct.pack("<f", weight))  # 4 bytes
+            # Sort by similarity (highest first)
+            connections.sort(key=itemgetter(1), reverse=True)
 
-            except (ValueError, KeyError) as e:
+            # Decode every UUID before writing so invalid IDs never leave a partial entry
+            try:
+                artist_bytes = _cached_uuid_bytes(target_id, uuid_cache)
+                source_bytes = [
+                    _cached_uuid_bytes(source_id, uuid_cache) for source_id, _ in connections
+                ]
+            except ValueError as e:
                 print(f"⚠️  Skipping invalid artist ID: {e}")
                 continue
 
+            # Store byte position for this artist in index
+            rev_index[target_id] = position
+
+            # Write binary format
+            _ENTRY_HEADER_STRUCT.pack_into(outfile, position, artist_bytes, len(connections))
+            position += ENTRY_HEADER_SIZE
+
+            for source_uuid_bytes, (_, weight) in zip(source_bytes, connections, strict=True):
+                _CONNECTION_STRUCT.pack_into(outfile, position, source_uuid_bytes, weight)
+                position += CONNECTION_SIZE
+    finally:
+        _close_mapped_output(fd, outfile, position)
+
     unique_artists = len(reverse_connections)
     print(
         f"✅ Reverse graph complete: {unique_artists:,} artists, {total_connections:,} connections",
@@ -396,18 +467,20 @@ def main() -> None:
 
     # Count graph lines once for both steps 1 and 2
     print(f"\n📊 Counting lines in {graph_file.name}...")
-    with graph_file.open() as f:
-        graph_line_count = sum(1 for line in f if line.strip())
+    graph_line_count = _count_lines(graph_file)
     print(f"   Found {graph_line_count:,} lines to process")
 
+    # Every artist id shows up in several outputs - decode each one only once
+    uuid_cache: dict[str, bytes] = {}
+
     # Step 1: Convert forward graph to binary
     print("\n📊 Step 1: Converting forward graph to binary format")
-    graph_stats = convert_graph_to_binary(graph_file, graph_line_count)
+    graph_stats = convert_graph_to_binary(graph_file, graph_line_count, uuid_cache)
     print(f"✅ Forward graph: {graph_stats['binary_size'] / MB:.1f} MB")
 
     # Step 2: Build reverse graph binary
     print("\n📊 Step 2: Building reverse graph binary")
-    rev_graph_stats = build_reverse_graph_binary(graph_file, graph_line_count)
+    rev_graph_stats = build_reverse_graph_binary(graph_file, graph_line_count, uuid_cache)
     print(f"✅ Reverse graph: {rev_graph_stats['binary_size'] / MB:.1f} MB")
 
     # Step 3: Create unified metadata binary with lookup and both indexes
@@ -424,6 +497,7 @@ def main() -> None:
         lookup,
         forward_index,
         reverse_index,
+        uuid_cache,
     )
     print(f"✅ Metadata binary: {metadata_stats['binary_size'] / MB:.1f} MB")
     print(f"   Lookup entries: {metadata_stats['lookup_entries']:,}")
@@ -3,53 +3,170 @@
 
 import argparse
 import gc
-import gzip
+import heapq
 import json
-import pickle
+import math
 import random
 import time
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 import numpy.typing as npt
+import orjson
 import psutil
 from rich.console import Console
 from rich.progress import BarColumn, Progress, SpinnerColumn, TextColumn
 from rich.table import Table
-from scipy import stats
+from scipy.special import zeta
 
 console = Console()
 
 MAX_EDGES_PER_NODE = 250
 RESERVOIR_SIZE = 100000  # Max samples to keep in memory
+INITIAL_NODE_CAPACITY = 1 << 20  # Initial slots in the in-degree count buffer
+ID_PREFIXES = (b'{"id": "', b'{"id":"')  # How json.dumps / orjson start each NDJSON record
+POWER_LAW_MIN_TAIL = 50  # Min observations at or above a candidate xmin
+POWER_LAW_MAX_XMIN_CANDIDATES = 200  # Candidate xmin values scanned for the KS minimum
+READ_BUFFER_SIZE = 4 * 1024 * 1024  # 4MB read buffer for NDJSON passes (orjson takes bytes)
+HYPERGEOMETRIC_MAX_POPULATION = 10**9  # numpy's hypergeometric needs each population below this
+
+
+def peek_id(line: bytes) -> str | None:
+    """Read the leading "id" of an NDJSON record without decoding the rest of the line.
+
+    Returns None if the line is not laid out as expected, so callers fall back to a full decode.
+    """
+    prefix = next((prefix for prefix in ID_PREFIXES if line.startswith(prefix)), None)
+    if prefix is None:
+        return None
+    end = line.find(b'"', len(prefix))
+    if end < 0:
+        return None
+    raw_id = line[len(prefix) : end]
+    if b"\\" in raw_id:
+        return None
+    return raw_id.decode()
+
+
+def split_sample_count(n_first: int, n_second: int, k: int) -> int:
+    """Draw how many of k uniform picks without replacement fall in the first of two populations."""
+    rng = np.random.default_rng(random.getrandbits(64))
+    if max(n_first, n_second) < HYPERGEOMETRIC_MAX_POPULATION:
+        return int(rng.hypergeometric(n_first, n_second, k))
+    # Populations this large dwarf k, so the binomial approximation is accurate
+    picked = int(rng.binomial(k, n_first / (n_first + n_second)))
+    return min(max(picked, k - n_second), n_first)
 
 
 class ReservoirSampler:
-    """Reservoir sampling for memory-bounded distribution collection."""
+    """Reservoir sampling for memory-bounded distribution collection.
+
+    Uses Algorithm L: once the reservoir is full it draws how many items to skip
+    before the next replacement, so most adds are a single comparison instead of
+    a random draw per item.
+    """
 
     def __init__(self, size: int = RESERVOIR_SIZE) -> None:
         self.size = size
         self.reservoir = []
         self.n = 0
+        self._log_w = 0.0
+        self._next_index = 0
+
+    def _schedule_next(self) -> None:
+        """Draw the (1-based) index of the next item that enters the reservoir."""
+        # W is kept in log space; 1 - random() is in (0, 1] so log() never sees zero
+        self._log_w += math.log(1.0 - random.random()) / self.size
+        skip = math.floor(math.log(1.0 - random.random()) / math.log(-math.expm1(self._log_w)))
+        self._next_index += skip + 1
 
     def add(self, item: object) -> None:
         """Add item using reservoir sampling algorithm."""
         self.n += 1
-        if len(self.reservoir) < self.size:
+        if self.n <= self.size:
             self.reservoir.append(item)
-        else:
-            # Randomly replace with decreasing probability
-            j = random.randint(0, self.n - 1)
-            if j < self.size:
-                self.reservoir[j] = item
+            if self.n == self.size:
+                self._next_index = self.n
+                self._schedule_next()
+        elif self.n == self._next_index:
+            # Replace a uniformly chosen slot, then jump ahead
+            self.reservoir[random.randrange(self.size)] = item
+            self._schedule_next()
+
+    def merge(self, other: "ReservoirSampler") -> None:
+        """Combine with a sampler fed from a disjoint stream into one uniform sample of both.
+
+        The merged sampler is meant to be read, not fed further.
+        """
+        keep = min(self.size, self.n + other.n)
+        from_self = split_sample_count(self.n, other.n, keep)
+        self.reservoir = random.sample(self.reservoir, from_self) + random.sample(
+            other.reservoir,
+            keep - from_self,
+        )
+        self.n += other.n
 
     def get_samples(self) -> list[object]:
         """Get collected samples."""
         return self.reservoir
 
 
+class ArrayReservoirSampler(ReservoirSampler):
+    """Reservoir sampler over a preallocated NumPy buffer, fed in batches."""
+
+    def __init__(self, size: int = RESERVOIR_SIZE, dtype: npt.DTypeLike = np.float64) -> None:
+        super().__init__(size)
+        self.reservoir = np.empty(size, dtype=dtype)
+
+    def add(self, item: float) -> None:
+        """Add a single value."""
+        self.add_many(np.array([item], dtype=self.reservoir.dtype))
+
+    def add_many(self, values: npt.NDArray[Any]) -> None:
+        """Add a batch of values; only the items picked by the skip schedule are touched."""
+        start = self.n
+        self.n += len(values)
+
+        # Fill phase: copy straight into the free slots
+        if start < self.size:
+            filled = min(len(values), self.size - start)
+            self.reservoir[start : start + filled] = values[:filled]
+            if start + filled == self.size:
+                self._next_index = self.size
+                self._schedule_next()
+
+        # Replacement phase: jump to each scheduled item inside this batch
+        if self.n > self.size:
+            while self._next_index <= self.n:
+                slot = random.randrange(self.size)
+                self.reservoir[slot] = values[self._next_index - start - 1]
+                self._schedule_next()
+
+    def merge(self, other: "ArrayReservoirSampler") -> None:
+        """Combine with a sampler fed from a disjoint stream into one uniform sample of both.
+
+        The merged sampler is meant to be read, not fed further.
+        """
+        own, theirs = self.get_samples(), other.get_samples()
+        keep = min(self.size, self.n + other.n)
+        from_self = split_sample_count(self.n, other.n, keep)
+        merged = np.concatenate(
+            [
+                own[random.sample(range(len(own)), from_self)],
+                theirs[random.sample(range(len(theirs)), keep - from_self)],
+            ],
+        )
+        self.reservoir[:keep] = merged
+        self.n += other.n
+
+    def get_samples(self) -> npt.NDArray[Any]:
+        """Get collected samples."""
+        return self.reservoir[: min(self.n, self.size)]
+
+
 class StreamingGraphMetrics:
     """Memory-efficient streaming graph metrics with reservoir sampling."""
 
@@ -59,33 +176,142 @@ class StreamingGraphMetrics:
 
         # Reservoir samplers for distributions
         self.out_degree_sampler: ReservoirSampler = ReservoirSampler(RESERVOIR_SIZE)
-        self.in_degree_counter: dict[str, int] = defaultdict(
-            int,
-        )  # Need full counter for accurate top nodes
-        self.weight_sampler: ReservoirSampler = ReservoirSampler(
+        # Full in-degree counts (needed for accurate top nodes), keyed by interned node index
+        self.node_id_to_idx: dict[str, int] = {}
+        self.node_ids: list[str] = []
+        self.in_degree_counts: npt.NDArray[np.int32] = np.zeros(
+            INITIAL_NODE_CAPACITY,
+            dtype=np.int32,
+        )
+        self.weight_sampler: ArrayReservoirSampler = ArrayReservoirSampler(
             RESERVOIR_SIZE,
-        )  # Same size as other samplers
-
-        # For reciprocity - we'll do a second pass on a sample
-        self.edges_for_reciprocity: list[tuple[str, str]] = []  # Sample of edges to check
+        )  # Same size as other samplers, fed one node's weights at a time
+
+        # For reciprocity - sample the first edges and resolve their reverses during the same pass
+        # Edges are packed as (source_idx << 32) | target_idx over interned node indices
+        self.reciprocity_edges: set[int] = set()  # Sample of edges to check
+        self.reciprocity_pending: set[int] = set()  # Reverse edges not seen yet
+        self.reciprocity_sampled: int = 0
+        self.reciprocal_count: int = 0
         self.reciprocity_sample_size: int = min(1000000, RESERVOIR_SIZE * 10)  # 1M edges to check
 
         # Basic counters
         self.num_edges: int = 0
         self.num_source_nodes: int = 0
-        self.nodes_seen: set[str] = set()
 
         # Top node tracking
-        self.top_out_degrees: list[tuple[int, str]] = []  # [(degree, node_id)]
+        # Min-heap of (degree, -byte offset, node_id): ties keep the earliest lines, so
+        # merging worker ranges gives the same top nodes as one sequential pass
+        self.top_out_degrees: list[tuple[int, int, str]] = []
         self.top_k: int = 100
 
         random.seed(42)
 
-    def process_graph(self) -> None:
-        """Single streaming pass through graph."""
+    @property
+    def in_degrees(self) -> npt.NDArray[np.int32]:
+        """In-degree counts of nodes that appear as a target (sources are interned too)."""
+        counts = self.in_degree_counts[: len(self.node_ids)]
+        return counts[counts > 0]
+
+    def _reserve_in_degrees(self) -> None:
+        """Grow the in-degree buffer so every interned node has a slot."""
+        capacity = len(self.in_degree_counts)
+        if len(self.node_ids) > capacity:
+            grown = np.zeros(max(len(self.node_ids), capacity * 2), dtype=np.int32)
+            grown[:capacity] = self.in_degree_counts
+            self.in_degree_counts = grown
+
+    def _add_in_degrees(self, target_indices: list[int]) -> None:
+        """Increment in-degree counts for interned targets, growing the buffer as needed."""
+        self._reserve_in_degrees()
+        np.add.at(self.in_degree_counts, target_indices, 1)
+
+    def _intern(self, node_id: str) -> int:
+        """Return the dense index of a node id, assigning the next free one if unseen."""
+        idx = self.node_id_to_idx.get(node_id)
+        if idx is None:
+            idx = self.node_id_to_idx[node_id] = len(self.node_ids)
+            self.node_ids.append(node_id)
+        return idx
+
+    def _process_record(self, data: dict[str, Any], offset: int) -> None:
+        """Update all streaming statistics with one decoded graph line starting at offset."""
+        node_id_to_idx = self.node_id_to_idx
+        node_ids = self.node_ids
+
+        artist_id = data["id"]
+        connections = data["connections"]
+        if len(connections) > MAX_EDGES_PER_NODE:  # Only copy when truncation is needed
+            connections = connections[:MAX_EDGES_PER_NODE]
+
+        # Track source node (interning doubles as the set of nodes seen)
+        self.num_source_nodes += 1
+        source_idx = self._intern(artist_id)
+
+        # Out-degree sampling
+        out_degree = len(connections)
+        self.out_degree_sampler.add(out_degree)
+
+        # Track top out-degrees efficiently
+        if len(self.top_out_degrees) < self.top_k:
+            heapq.heappush(self.top_out_degrees, (out_degree, -offset, artist_id))
+        elif out_degree > self.top_out_degrees[0][0]:
+            heapq.heapreplace(self.top_out_degrees, (out_degree, -offset, artist_id))
+
+        if not connections:
+            return
+
+        # Process connections: split into id and weight columns once
+        conn_ids, weights = zip(*connections, strict=True)
+        self.num_edges += out_degree
+
+        target_indices = []
+        for conn_id in conn_ids:
+            # In-degree tracking (intern id, count per node below)
+            idx = node_id_to_idx.get(conn_id)
+            if idx is None:
+                idx = node_id_to_idx[conn_id] = len(node_ids)
+                node_ids.append(conn_id)
+            target_indices.append(idx)
+
+            # Reciprocity: this edge may be the reverse of a sampled edge
+            edge = (source_idx << 32) | idx
+            if edge in self.reciprocity_pending:
+                self.reciprocity_pending.remove(edge)
+                self.reciprocal_count += 1
+
+            # Sample edges for reciprocity check (the sample is a file prefix,
+            # so a reverse edge seen earlier is already in the sample)
+            if self.reciprocity_sampled < self.reciprocity_sample_size:
+                self.reciprocity_sampled += 1
+                if edge not in self.reciprocity_edges:
+                    self.reciprocity_edges.add(edge)
+                    reverse_edge = (idx << 32) | source_idx
+                    if reverse_edge in self.reciprocity_edges:
+                        self.reciprocal_count += 1
+                    else:
+                        self.reciprocity_pending.add(reverse_edge)
+                if self.reciprocity_sampled == self.reciprocity_sample_size:
+                    # Sample complete: only pending reverses matter now
+                    self.reciprocity_edges.clear()
+
+        self._add_in_degrees(target_indices)
+
+        # Add this node's weights to the reservoir sampler in one batch
+        self.weight_sampler.add_many(np.array(weights, dtype=np.float64))
+
+    def process_graph(self, workers: int = 1) -> None:
+        """Single streaming pass through graph.
+
+        With several workers, only the prefix holding the reciprocity sample is read
+        here; the rest of the file is split into newline-aligned byte ranges that are
+        processed in parallel and merged back.
+        """
         console.print("[cyan]Processing graph with reservoir sampling...")
 
         nodes_processed = 0
+        position = 0
+        parallel_offset = None
 
         with Progress(
             SpinnerColumn(),
@@ -95,109 +321,106 @@ class StreamingGraphMetrics:
         ) as progress:
             task = progress.add_task("Streaming through graph...", total=None)
 
-            with self.graph_path.open() as f:
+            with self.graph_path.open("rb", buffering=READ_BUFFER_SIZE) as f:
                 for line_num, line in enumerate(f):
+                    line_start = position
+                    position += len(line)
                     if not line.strip():
                         continue
 
                     try:
-                        data = json.loads(line)
-                        artist_id = data["id"]
-                        connections = data["connections"][:MAX_EDGES_PER_NODE]
-
-                        # Track source node
-                        self.num_source_nodes += 1
-                        self.nodes_seen.add(artist_id)
-
-                        # Out-degree sampling
-                        out_degree = len(connections)
-                        self.out_degree_sampler.add(out_degree)
-
-                        # Track top out-degrees efficiently
-                        if len(self.top_out_degrees) < self.top_k:
-                            self.top_out_degrees.append((out_degree, artist_id))
-                            self.top_out_degrees.sort(reverse=True)
-                        elif out_degree > self.top_out_degrees[-1][0]:
-                            self.top_out_degrees[-1] = (out_degree, artist_id)
-                            self.top_out_degrees.sort(reverse=True)
-
-                        # Process connections
-                        for conn_id, weight in connections:
-                            self.nodes_seen.add(conn_id)
-                            self.num_edges += 1
-
-                            # In-degree tracking (need full counter for top nodes)
-                            self.in_degree_counter[conn_id] += 1
-
-                            # Add weight to reservoir sampler (handles sampling internally)
-                            self.weight_sampler.add(float(weight))
-
-                            # Sample edges for reciprocity check (collect first, check later)
-                            if len(self.edges_for_reciprocity) < self.reciprocity_sample_size:
-                                self.edges_for_reciprocity.append((artist_id, conn_id))
-
-                        nodes_processed += 1
-                        if nodes_processed % 10000 == 0:
-                            progress.update(
-                                task,
-                                description=f"Processed {nodes_processed:,} nodes, {self.num_edges:,} edges",
-                            )
-                            if nodes_processed % 50000 == 0:
-                                # Periodic memory cleanup
-                                gc.collect()
-
+                        self._process_record(orjson.loads(line), line_start)
                     except (json.JSONDecodeError, KeyError) as e:
                         console.print(f"[yellow]Warning: Skipping line {line_num}: {e}")
+                        continue
 
-        console.print(
-            f"[green]✓ Processed {len(self.nodes_seen):,} nodes, {self.num_edges:,} edges",
-        )
+                    nodes_processed += 1
+                    if nodes_processed % 10000 == 0:
+                        progress.update(
+                            task,
+                            description=f"Processed {nodes_processed:,} nodes, {self.num_edges:,} edges",
+                        )
+                        if nodes_processed % 50000 == 0:
+                            # Periodic memory cleanup
+                            gc.collect()
 
-    def calculate_reciprocity(self) -> float:
-        """Second pass to calculate reciprocity from edge sample."""
-        console.print("\n[cyan]Calculating reciprocity from edge sample...")
+                    if workers > 1 and self.reciprocity_sampled >= self.reciprocity_sample_size:
+                        parallel_offset = position
+                        break
 
-        if not self.edges_for_reciprocity:
-            return 0.0
+        if parallel_offset is not None and parallel_offset < self.graph_path.stat().st_size:
+            self._process_remaining_parallel(parallel_offset, workers)
 
-        # Build set of sampled edges for fast lookup
-        sampled_edges = set(self.edges_for_reciprocity)
-        edges_to_check = {(b, a) for a, b in self.edges_for_reciprocity}  # Reverse edges
+        console.print(
+            f"[green]✓ Processed {len(self.node_ids):,} nodes, {self.num_edges:,} edges",
+        )
 
-        # Second pass: check which reverse edges exist
-        reciprocal_count = 0
-        edges_found = set()
+    def _process_remaining_parallel(self, offset: int, workers: int) -> None:
+        """Process the graph from byte offset onwards in worker processes and merge results."""
+        file_size = self.graph_path.stat().st_size
+        bounds = np.linspace(offset, file_size, workers + 1).astype(np.int64).tolist()
 
-        with self.graph_path.open() as f:
-            for line in f:
-                if not line.strip():
-                    continue
+        # Workers only need the reverse edges still waiting for a match, as id pairs
+        pending_edges = [
+            (self.node_ids[edge >> 32], self.node_ids[edge & 0xFFFFFFFF])
+            for edge in self.reciprocity_pending
+        ]
 
-                try:
-                    data = json.loads(line)
-                    artist_id = data["id"]
+        console.print(
+            f"[cyan]Processing remaining {(file_size - offset) / 1024**2:,.0f}MB "
+            f"with {workers} workers...",
+        )
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partials = executor.map(
+                process_graph_range,
+                repeat(self.graph_path),
+                bounds[:-1],
+                bounds[1:],
+                repeat(pending_edges),
+            )
+            for partial in partials:
+                self._merge_partial(partial)
+
+    def _merge_partial(self, partial: dict[str, Any]) -> None:
+        """Fold a worker's partial result into this accumulator."""
+        self.num_source_nodes += partial["num_source_nodes"]
+        self.num_edges += partial["num_edges"]
+
+        # Worker node indices are local; map them onto ours (each local node is distinct)
+        global_indices = np.fromiter(
+            (self._intern(node_id) for node_id in partial["node_ids"]),
+            dtype=np.int64,
+            count=len(partial["node_ids"]),
+        )
+        self._reserve_in_degrees()
+        self.in_degree_counts[global_indices] += partial["in_degree_counts"]
 
-                    for conn_id, _ in data["connections"][:MAX_EDGES_PER_NODE]:
-                        edge = (artist_id, conn_id)
-                        if edge in edges_to_check and (conn_id, artist_id) in sampled_edges:
-                            reciprocal_count += 1
-                            edges_found.add(edge)
-                            edges_to_check.remove(edge)  # Don't count twice
+        self.out_degree_sampler.merge(partial["out_degree_sampler"])
+        self.weight_sampler.merge(partial["weight_sampler"])
 
-                            if not edges_to_check:  # Found all we need
-                                break
+        self.top_out_degrees = heapq.nlargest(
+            self.top_k,
+            self.top_out_degrees + partial["top_out_degrees"],
+        )
+        heapq.heapify(self.top_out_degrees)
 
-                except (json.JSONDecodeError, KeyError):
-                    continue
+        # Pending reverse edges found by the worker; removal keeps repeats from double counting
+        for source_id, target_id in partial["reciprocal_edges"]:
+            edge = (self._intern(source_id) << 32) | self._intern(target_id)
+            if edge in self.reciprocity_pending:
+                self.reciprocity_pending.remove(edge)
+                self.reciprocal_count += 1
 
-                if not edges_to_check:
-                    break
+    def calculate_reciprocity(self) -> float:
+        """Calculate reciprocity from the edge sample resolved during process_graph."""
+        console.print("\n[cyan]Calculating reciprocity from edge sample...")
 
-        reciprocity = (
-            reciprocal_count / len(self.edges_for_reciprocity) if self.edges_for_reciprocity else 0
-        )
+        if not self.reciprocity_sampled:
+            return 0.0
+
+        reciprocity = self.reciprocal_count / self.reciprocity_sampled
         console.print(
-            f"[green]✓ Found {reciprocal_count:,} reciprocal pairs out of {len(self.edges_for_reciprocity):,} sampled edges",
+            f"[green]✓ Found {self.reciprocal_count:,} reciprocal pairs out of {self.reciprocity_sampled:,} sampled edges",
         )
         return reciprocity
 
@@ -219,15 +442,14 @@ class StreamingGraphMetrics:
         console.print(f"[cyan]Sampling {node_sample:,} nodes...")
         all_node_ids = []
 
-        with self.graph_path.open() as f:
+        with self.graph_path.open("rb", buffering=READ_BUFFER_SIZE) as f:
             for line in f:
                 if not line.strip():
                     continue
                 try:
-                    data = json.loads(line)
+                    data = orjson.loads(line)
                     artist_id = data["id"]
-                    connections = data["connections"][:MAX_EDGES_PER_NODE]
-                    if connections:  # Only consider nodes with outgoing edges
+                    if data["connections"]:  # Only consider nodes with outgoing edges
                         all_node_ids.append(artist_id)
                 except (json.JSONDecodeError, KeyError):
                     continue
@@ -241,22 +463,27 @@ class StreamingGraphMetrics:
         adjacency: dict[str, set[str]] = {}
         nodes_with_edges = []
 
-        with self.graph_path.open() as f:
+        with self.graph_path.open("rb", buffering=READ_BUFFER_SIZE) as f:
             for line in f:
                 if not line.strip():
                     continue
+                # Only load if this node was sampled (skip decoding everything else)
+                peeked_id = peek_id(line)
+                if peeked_id is not None and peeked_id not in sampled_nodes:
+                    continue
+
                 try:
-                    data = json.loads(line)
+                    data = orjson.loads(line)
                     artist_id = data["id"]
-
-                    # Only load if this node was sampled
                     if artist_id not in sampled_nodes:
                         continue
 
-                    connections = data["connections"][:MAX_EDGES_PER_NODE]
+                    connections = data["connections"]
                     if connections:
                         neighbors = {
-                            conn_id for conn_id, weight in connections if float(weight) > 0
+                            conn_id
+                            for conn_id, weight in islice(connections, MAX_EDGES_PER_NODE)
+                            if float(weight) > 0
                         }
                         if neighbors:
                             adjacency[artist_id] = neighbors
@@ -325,80 +552,26 @@ class StreamingGraphMetrics:
         }
 
     def calculate_power_law_fits(self) -> dict[str, dict[str, Any]]:
-        """Calculate power law fits from sampled distributions."""
+        """Calculate power law fits (discrete MLE) from sampled out-degrees and full in-degrees."""
         results: dict[str, dict[str, Any]] = {}
 
-        # Out-degree power law from samples
-        out_degrees = np.array(self.out_degree_sampler.get_samples())
-        if len(out_degrees) > 0:
-            unique_out, counts_out = np.unique(out_degrees[out_degrees > 0], return_counts=True)
-
-            if len(unique_out) > 1:
-                log_degrees_out = np.log10(unique_out)
-                log_counts_out = np.log10(counts_out)
-                slope_out, intercept_out, r_value_out, _, _ = stats.linregress(
-                    log_degrees_out,
-                    log_counts_out,
-                )
-
-                # Limit to reasonable size for JSON
-                max_points = 1000
-                if len(unique_out) > max_points:
-                    indices = np.linspace(0, len(unique_out) - 1, max_points, dtype=int)
-                    unique_out = unique_out[indices]
-                    counts_out = counts_out[indices]
-
-                results["out_degree_fit"] = {
-                    "alpha": -slope_out,
-                    "intercept": intercept_out,
-                    "r_squared": r_value_out**2,
-                    "fit_range": [float(unique_out.min()), float(unique_out.max())],
-                    "n_points": len(unique_out),
-                }
-
-        # In-degree power law - sample from full counter
-        in_degrees = list(self.in_degree_counter.values())
-        unique_in, counts_in = np.unique(in_degrees, return_counts=True)
-
-        if len(unique_in) > 1:
-            positive_mask = unique_in > 0
-            if np.any(positive_mask):
-                log_degrees_in = np.log10(unique_in[positive_mask])
-                log_counts_in = np.log10(counts_in[positive_mask])
-                slope_in, intercept_in, r_value_in, _, _ = stats.linregress(
-                    log_degrees_in,
-                    log_counts_in,
-                )
-
-                # Limit size for JSON
-                unique_in_pos = unique_in[positive_mask]
-                counts_in_pos = counts_in[positive_mask]
-                max_points = 1000
-                if len(unique_in_pos) > max_points:
-                    indices = np.linspace(0, len(unique_in_pos) - 1, max_points, dtype=int)
-                    unique_in_pos = unique_in_pos[indices]
-                    counts_in_pos = counts_in_pos[indices]
-
-                results["in_degree_fit"] = {
-                    "alpha": -slope_in,
-                    "intercept": intercept_in,
-                    "r_squared": r_value_in**2,
-                    "fit_range": [
-                        float(unique_in[positive_mask].min()),
-                        float(unique_in[positive_mask].max()),
-                    ],
-                    "n_points": len(unique_in[positive_mask]),
-                }
+        out_degree_fit = fit_power_law(np.array(self.out_degree_sampler.get_samples()))
+        if out_degree_fit is not None:
+            results["out_degree_fit"] = out_degree_fit
+
+        in_degree_fit = fit_power_law(self.in_degrees)
+        if in_degree_fit is not None:
+            results["in_degree_fit"] = in_degree_fit
 
         return results
 
     def get_basic_stats(self, reciprocity: float) -> dict[str, Any]:
         """Calculate basic statistics from samples."""
         out_degrees = np.array(self.out_degree_sampler.get_samples())
-        in_degrees = np.array(list(self.in_degree_counter.values()))
-        weights = np.array(self.weight_sampler.get_samples())
+        in_degrees = self.in_degrees
+        weights = self.weight_sampler.get_samples()
 
-        num_nodes = len(self.nodes_seen)
+        num_nodes = len(self.node_ids)
 
         return {
             "dataset_info": {
@@ -410,40 +583,24 @@ class StreamingGraphMetrics:
             "basic_metrics": {
                 "density": self.num_edges / (num_nodes * (num_nodes - 1)) if num_nodes > 1 else 0,
                 "reciprocity": reciprocity,
-                "reciprocity_sample_size": len(self.edges_for_reciprocity),
+                "reciprocity_sample_size": self.reciprocity_sampled,
             },
             "degree_stats": {
                 "out_degree": {
-                    "mean": float(np.mean(out_degrees)),
-                    "median": float(np.median(out_degrees)),
-                    "std": float(np.std(out_degrees)),
-                    "min": int(np.min(out_degrees)),
-                    "max": int(np.max(out_degrees)),
-                    "q25": float(np.percentile(out_degrees, 25)),
-                    "q75": float(np.percentile(out_degrees, 75)),
-                    "gini": calculate_gini(out_degrees),
+                    **summarize_distribution(out_degrees, include_gini=True),
                     "sample_size": len(out_degrees),
                 },
                 "in_degree": {
-                    "mean": float(np.mean(in_degrees)),
-                    "median": float(np.median(in_degrees)),
-                    "std": float(np.std(in_degrees)),
-                    "min": int(np.min(in_degrees)),
-                    "max": int(np.max(in_degrees)),
-                    "q25": float(np.percentile(in_degrees, 25)),
-                    "q75": float(np.percentile(in_degrees, 75)),
-                    "gini": calculate_gini(in_degrees),
+                    **summarize_distribution(in_degrees, include_gini=True),
                     "full_count": len(in_degrees),
                 },
             },
             "weight_stats": {
-                "mean": float(np.mean(weights)) if len(weights) > 0 else 0,
-                "median": float(np.median(weights)) if len(weights) > 0 else 0,
-                "std": float(np.std(weights)) if len(weights) > 0 else 0,
-                "min": float(np.min(weights)) if len(weights) > 0 else 0,
-                "max": float(np.max(weights)) if len(weights) > 0 else 0,
-                "q25": float(np.percentile(weights, 25)) if len(weights) > 0 else 0,
-                "q75": float(np.percentile(weights, 75)) if len(weights) > 0 else 0,
+                **(
+                    summarize_distribution(weights)
+                    if len(weights) > 0
+                    else dict.fromkeys(("mean", "median", "std", "min", "max", "q25", "q75"), 0)
+                ),
                 "sample_size": len(weights),
             },
         }
@@ -451,13 +608,27 @@ class StreamingGraphMetrics:
     def get_top_nodes(self, n: int = 20) -> dict[str, list[tuple[str, int]]]:
         """Get top nodes by degree with names."""
         # Get top by in-degree
-        top_in_items = sorted(self.in_degree_counter.items(), key=lambda x: x[1], reverse=True)[:n]
+        in_degrees = self.in_degree_counts[: len(self.node_ids)]
+        # O(N) partition for the n-th largest degree, then order every node at or above it
+        # by (-degree, dense index) so ties, including those at the cutoff, go to the node
+        # seen first in the file
+        n_top = min(n, len(in_degrees))
+        top_in_order = np.arange(0)
+        if n_top:
+            cutoff = -np.partition(-in_degrees, n_top - 1)[n_top - 1]
+            candidates = np.flatnonzero(in_degrees >= cutoff)
+            top_in_order = candidates[np.lexsort((candidates, -in_degrees[candidates]))][:n_top]
+        top_in_items = [
+            (self.node_ids[idx], int(in_degrees[idx]))
+            for idx in top_in_order
+            if in_degrees[idx] > 0
+        ]
         top_in_ids = [node_id for node_id, _ in top_in_items]
 
         # Get top by out-degree (deduplicate by node_id)
         seen_ids = set()
         top_out_deduped = []
-        for deg, node_id in self.top_out_degrees:
+        for deg, _, node_id in sorted(self.top_out_degrees, reverse=True):
             if node_id not in seen_ids:
                 top_out_deduped.append((deg, node_id))
                 seen_ids.add(node_id)
@@ -469,15 +640,22 @@ class StreamingGraphMetrics:
         node_names = {}
         if self.metadata_path and self.metadata_path.exists():
             console.print("\n[cyan]Loading metadata for top nodes...")
-            all_top_ids = set(top_in_ids + top_out_ids)
+            remaining_ids = set(top_in_ids + top_out_ids)
 
-            with self.metadata_path.open() as f:
+            # Stop as soon as every top node has a name
+            with self.metadata_path.open("rb", buffering=READ_BUFFER_SIZE) as f:
                 for line in f:
+                    if not remaining_ids:
+                        break
                     if not line.strip():
                         continue
-                    data = json.loads(line)
-                    if data["id"] in all_top_ids:
+                    peeked_id = peek_id(line)
+                    if peeked_id is not None and peeked_id not in remaining_ids:
+                        continue
+                    data = orjson.loads(line)
+                    if data["id"] in remaining_ids:
                         node_names[data["id"]] = data["name"]
+                        remaining_ids.discard(data["id"])
 
         return {
             "top_by_in_degree": [(node_names.get(nid, nid), deg) for nid, deg in top_in_items],
@@ -497,14 +675,14 @@ class StreamingGraphMetrics:
         out_degree_samples = self.out_degree_sampler.get_samples()
 
         # Sample in-degrees if too many
-        in_degree_values = list(self.in_degree_counter.values())
+        in_degree_values = self.in_degrees.tolist()
         if len(in_degree_values) > RESERVOIR_SIZE:
             in_degree_samples = random.sample(in_degree_values, RESERVOIR_SIZE)
         else:
             in_degree_samples = in_degree_values
 
         # Get weight samples
-        weight_samples = self.weight_sampler.get_samples()
+        weight_samples = self.weight_sampler.get_samples().tolist()
 
         # Create distributions dictionary
         distributions = {
@@ -512,15 +690,21 @@ class StreamingGraphMetrics:
             "in_degrees": in_degree_samples,
             "weights": weight_samples,
             "reciprocity_info": {
-                "sampled_edges": len(self.edges_for_reciprocity),
+                "sampled_edges": self.reciprocity_sampled,
                 "reciprocity": reciprocity,
             },
         }
 
-        # Save as compressed pickle
-        dist_path = output_dir / f"{output_name}_distributions.pkl.gz"
-        with gzip.open(dist_path, "wb") as f:
-            pickle.dump(distributions, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Save as compressed NumPy arrays
+        dist_path = output_dir / f"{output_name}_distributions.npz"
+        np.savez_compressed(
+            dist_path,
+            out_degrees=np.asarray(out_degree_samples, dtype=np.int32),
+            in_degrees=np.asarray(in_degree_samples, dtype=np.int32),
+            weights=np.asarray(weight_samples, dtype=np.float64),
+            reciprocity_sampled_edges=self.reciprocity_sampled,
+            reciprocity=reciprocity,
+        )
         console.print(f"[green]✓ Saved distributions: {dist_path}")
 
         # Save representative sample as JSON for Quarto
@@ -545,12 +729,150 @@ class StreamingGraphMetrics:
         console.print(f"[green]✓ Saved JSON sample: {json_path}")
 
 
-def calculate_gini(values: npt.NDArray[np.float64]) -> float:
-    """Calculate Gini coefficient."""
+def process_graph_range(
+    graph_path: Path,
+    start: int,
+    end: int,
+    pending_edges: list[tuple[str, str]],
+) -> dict[str, Any]:
+    """Process the graph lines that start inside [start, end) into a mergeable partial result.
+
+    Runs in a worker process. Reciprocity sampling stays off; the parent's pending reverse
+    edges are interned up front so the regular per-edge check records which ones appear.
+    """
+    metrics = StreamingGraphMetrics(graph_path, None)
+    random.seed(42 + start)  # Independent sampling streams per range
+    metrics.reciprocity_sample_size = 0
+    for source_id, target_id in pending_edges:
+        metrics.reciprocity_pending.add(
+            (metrics._intern(source_id) << 32) | metrics._intern(target_id),
+        )
+    initial_pending = set(metrics.reciprocity_pending)
+
+    with graph_path.open("rb", buffering=READ_BUFFER_SIZE) as f:
+        # Skip the line that straddles start; it belongs to the previous range
+        position = start
+        if start > 0:
+            f.seek(start - 1)
+            position = start - 1 + len(f.readline())
+
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            line_start = position
+            position += len(line)
+            if not line.strip():
+                continue
+
+            try:
+                metrics._process_record(orjson.loads(line), line_start)
+            except (json.JSONDecodeError, KeyError) as e:
+                console.print(f"[yellow]Warning: Skipping line at byte {line_start}: {e}")
+
+    node_ids = metrics.node_ids
+    found_edges = initial_pending - metrics.reciprocity_pending
+    return {
+        "num_source_nodes": metrics.num_source_nodes,
+        "num_edges": metrics.num_edges,
+        "node_ids": node_ids,
+        "in_degree_counts": metrics.in_degree_counts[: len(node_ids)].copy(),
+        "out_degree_sampler": metrics.out_degree_sampler,
+        "weight_sampler": metrics.weight_sampler,
+        "top_out_degrees": metrics.top_out_degrees,
+        "reciprocal_edges": [
+            (node_ids[edge >> 32], node_ids[edge & 0xFFFFFFFF]) for edge in found_edges
+        ],
+    }
+
+
+def fit_power_law(values: npt.NDArray[np.integer]) -> dict[str, Any] | None:
+    """Fit a discrete power law p(k) ~ k^-alpha to the positive values by maximum likelihood.
+
+    Follows Clauset, Shalizi & Newman (2009): for each candidate xmin, alpha is the
+    discrete MLE approximation 1 + n / sum(ln(k / (xmin - 0.5))) over the tail k >= xmin,
+    and the xmin whose fit has the smallest KS distance to the tail is kept.
+    """
+    # Degrees are small non-negative ints, so a histogram replaces np.unique's sort
+    bins = np.bincount(values[values > 0])
+    unique = np.flatnonzero(bins)
+    counts = bins[unique]
+    if len(unique) < 2:
+        return None
+
+    # Suffix sums give n and sum(ln k) of the tail for every candidate xmin at once
+    n_tail = np.cumsum(counts[::-1])[::-1]
+    log_sum_tail = np.cumsum((counts * np.log(unique))[::-1])[::-1]
+    alphas = 1 + n_tail / (log_sum_tail - n_tail * np.log(unique - 0.5))
+
+    # Keep at least two distinct values in the tail; thin out long candidate lists geometrically
+    candidates = np.flatnonzero(n_tail[:-1] >= POWER_LAW_MIN_TAIL)
+    if len(candidates) == 0:
+        candidates = np.array([0])
+    elif len(candidates) > POWER_LAW_MAX_XMIN_CANDIDATES:
+        picks = np.geomspace(1, len(candidates), POWER_LAW_MAX_XMIN_CANDIDATES).astype(int) - 1
+        candidates = candidates[np.unique(picks)]
+
+    best_ks, best_idx = np.inf, 0
+    for idx in candidates:
+        tail = unique[idx:]
+        empirical_cdf = np.cumsum(counts[idx:]) / n_tail[idx]
+        fitted_cdf = 1 - zeta(alphas[idx], tail + 1) / zeta(alphas[idx], tail[0])
+        ks = np.max(np.abs(empirical_cdf - fitted_cdf))
+        if ks < best_ks:
+            best_ks, best_idx = ks, idx
+
+    alpha = float(alphas[best_idx])
+    xmin = int(unique[best_idx])
+    return {
+        "alpha": alpha,
+        "xmin": xmin,
+        "ks_statistic": float(best_ks),
+        # Expected count at degree k is 10**intercept * k**-alpha over the fitted tail
+        "intercept": float(np.log10(n_tail[best_idx] / zeta(alpha, xmin))),
+        "fit_range": [float(xmin), float(unique[-1])],
+        "n_tail": int(n_tail[best_idx]),
+        "n_points": len(unique) - int(best_idx),
+    }
+
+
+def sorted_quantile(sorted_values: npt.NDArray[Any], q: float) -> float:
+    """Quantile of pre-sorted values with linear interpolation (np.percentile's default)."""
+    position = (sorted_values.size - 1) * q
+    lower = math.floor(position)
+    upper = min(lower + 1, sorted_values.size - 1)
+    return float(
+        sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower),
+    )
+
+
+def summarize_distribution(
+    values: npt.NDArray[Any],
+    *,
+    include_gini: bool = False,
+) -> dict[str, Any]:
+    """Mean, spread and order statistics of a sample, all read off a single sort."""
     sorted_values = np.sort(values)
-    n = len(values)
-    cumsum = np.cumsum(sorted_values)
-    return (2 * np.sum((np.arange(1, n + 1)) * sorted_values)) / (n * cumsum[-1]) - (n + 1) / n
+    summary = {
+        "mean": float(values.mean()),
+        "median": sorted_quantile(sorted_values, 0.5),
+        "std": float(values.std()),
+        "min": sorted_values[0].item(),
+        "max": sorted_values[-1].item(),
+        "q25": sorted_quantile(sorted_values, 0.25),
+        "q75": sorted_quantile(sorted_values, 0.75),
+    }
+    if include_gini:
+        summary["gini"] = gini_from_sorted(sorted_values)
+    return summary
+
+
+def gini_from_sorted(sorted_values: npt.NDArray[Any]) -> float:
+    """Calculate Gini coefficient of values already sorted ascending."""
+    n = sorted_values.size
+    # sum(i * x_i) over ranks rewritten via the cumulative sums, so no rank array is built
+    cumsum = np.cumsum(sorted_values, dtype=np.float64)
+    return float((n + 1 - 2 * cumsum.sum() / cumsum[-1]) / n)
 
 
 def main() -> None:  # noqa: PLR0915
@@ -566,6 +888,12 @@ def main() -> None:  # noqa: PLR0915
         type=str,
         help="Output name prefix (default: graph)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for the streaming pass (default: 1; each keeps its own node table)",
+    )
     args = parser.parse_args()
 
     # Determine paths based on arguments
@@ -598,9 +926,9 @@ def main() -> None:  # noqa: PLR0915
     metrics = StreamingGraphMetrics(graph_path, metadata_path)
 
     # Process graph in single streaming pass
-    metrics.process_graph()
+    metrics.process_graph(workers=args.workers)
 
-    # Calculate reciprocity (requires second pass)
+    # Calculate reciprocity (resolved during the streaming pass)
     reciprocity = metrics.calculate_reciprocity()
 
     # Calculate clustering coefficient (requires second pass with adjacency)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Check that calculate_graph_metrics.py gives the same results with and without --workers."""
+
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+from uuid import UUID
+
+from calculate_graph_metrics import MAX_EDGES_PER_NODE, StreamingGraphMetrics
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+SYNTHETIC_NODES = 5000
+CAPPED_NODE_SHARE = 0.3  # Share of synthetic nodes above the out-degree cap (all tie at it)
+RECIPROCITY_SAMPLE_EDGES = 10000  # Small sample so most of the file goes to the workers
+
+
+def write_synthetic_graph(path: Path, n_nodes: int, seed: int) -> None:
+    """Write an NDJSON graph with many ties at the out-degree cap and among in-degrees."""
+    rng = random.Random(seed)
+    node_ids = [str(UUID(int=rng.getrandbits(128))) for _ in range(n_nodes)]
+
+    with path.open("w") as f:
+        for node_id in node_ids:
+            if rng.random() < CAPPED_NODE_SHARE:
+                degree = MAX_EDGES_PER_NODE + 50
+            else:
+                degree = rng.randint(0, MAX_EDGES_PER_NODE)
+            connections = [[target, rng.random()] for target in rng.sample(node_ids, degree)]
+            f.write(json.dumps({"id": node_id, "connections": connections}) + "\n")
+
+
+def run_streaming_pass(graph_path: Path, workers: int) -> StreamingGraphMetrics:
+    """Run the streaming pass that --workers parallelizes."""
+    metrics = StreamingGraphMetrics(graph_path, None)
+    metrics.reciprocity_sample_size = RECIPROCITY_SAMPLE_EDGES
+    metrics.process_graph(workers=workers)
+    return metrics
+
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="Compare sequential and parallel streaming graph metrics",
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        help="Graph NDJSON to check (default: a synthetic graph)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=3,
+        help="Worker processes for the parallel run (default: 3)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="Random seed for the synthetic graph (default: 42)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.input:
+            graph_path = Path(args.input)
+        else:
+            graph_path = Path(tmp_dir) / "graph.ndjson"
+            write_synthetic_graph(graph_path, SYNTHETIC_NODES, args.seed)
+
+        sequential = run_streaming_pass(graph_path, workers=1)
+        parallel = run_streaming_pass(graph_path, workers=args.workers)
+
+        checks = {
+            "Source nodes": (sequential.num_source_nodes, parallel.num_source_nodes),
+            "Edges": (sequential.num_edges, parallel.num_edges),
+            "Reciprocity": (sequential.calculate_reciprocity(), parallel.calculate_reciprocity()),
+            "Top nodes": (
+                sequential.get_top_nodes(n=sequential.top_k),
+                parallel.get_top_nodes(n=parallel.top_k),
+            ),
+        }
+
+    table = Table(title=f"Sequential vs {args.workers} workers")
+    table.add_column("Check", style="cyan")
+    table.add_column("Result")
+
+    mismatches = [name for name, (expected, actual) in checks.items() if expected != actual]
+    for name in checks:
+        table.add_row(name, "[red]mismatch" if name in mismatches else "[green]match")
+
+    console.print("\n")
+    console.print(table)
+
+    if mismatches:
+        console.print(f"[red]Parallel results differ: {', '.join(mismatches)}")
+        raise SystemExit(1)
+    console.print("[green]✓ Parallel results match the sequential run")
+
+
+if __name__ == "__main__":
+    main()
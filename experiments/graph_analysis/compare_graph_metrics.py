@@ -2,9 +2,10 @@
 """Compare metrics between full graph and subgraph with statistical tests."""
 
 import argparse
-import gzip
 import json
-import pickle
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
@@ -17,96 +18,182 @@ console = Console()
 
 
 def load_metrics(metrics_path: Path) -> dict[str, Any]:
-    """Load metrics from JSON file."""
-    with metrics_path.open() as f:
-        return json.load(f)
+    """Load metrics from JSON file.
+
+    Results are cached until the file's mtime changes; treat them as read-only.
+    """
+    return _load_metrics_cached(str(metrics_path), metrics_path.stat().st_mtime_ns)
 
 
 def load_distributions(dist_path: Path) -> dict[str, Any]:
-    """Load distribution data from compressed pickle."""
-    with gzip.open(dist_path, "rb") as f:
-        return pickle.load(f)
+    """Load distribution data from compressed NumPy archive.
+
+    Results are cached until the file's mtime changes; treat them as read-only.
+    """
+    return _load_distributions_cached(str(dist_path), dist_path.stat().st_mtime_ns)
+
 
+@lru_cache(maxsize=8)
+def _load_metrics_cached(metrics_path: str, mtime_ns: int) -> dict[str, Any]:  # noqa: ARG001
+    with Path(metrics_path).open() as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=8)
+def _load_distributions_cached(dist_path: str, mtime_ns: int) -> dict[str, Any]:  # noqa: ARG001
+    with np.load(dist_path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def calculate_relative_differences(
+    full_values: list[float],
+    sub_values: list[float],
+) -> list[float]:
+    """Calculate relative differences as percentages for paired values.
+
+    A zero full-graph value gives 0 when the subgraph value is also zero and inf otherwise.
+    """
+    full_arr = np.asarray(full_values, dtype=np.float64)
+    sub_arr = np.asarray(sub_values, dtype=np.float64)
+    abs_full = np.abs(full_arr)
+    nonzero = abs_full != 0
+    ratios = np.divide(
+        np.abs(full_arr - sub_arr),
+        abs_full,
+        out=np.zeros_like(full_arr),
+        where=nonzero,
+    )
+    return np.where(nonzero, ratios * 100, np.where(sub_arr == 0, 0.0, np.inf)).tolist()
 
-def calculate_relative_difference(val1: float, val2: float) -> float:
-    """Calculate relative difference as percentage."""
-    if val1 == 0:
-        return 0 if val2 == 0 else float("inf")
-    return abs(val1 - val2) / abs(val1) * 100
+
+def _limit_samples(data: np.ndarray, max_samples: int, rng: np.random.Generator) -> np.ndarray:
+    """Randomly subsample data down to max_samples values.
+
+    Generator.choice draws the indices without permuting the whole array,
+    unlike the legacy np.random.choice.
+    """
+    if len(data) > max_samples:
+        return data[rng.choice(len(data), max_samples, replace=False)]
+    return data
+
+
+def _interpret_test(p_value: float, differ: str, similar: str) -> str:
+    """Pick the interpretation for a test result at the 0.05 level."""
+    return differ if p_value < 0.05 else similar
 
 
 def perform_statistical_tests(
     full_dist: dict[str, list[float]],
     sub_dist: dict[str, list[float]],
 ) -> dict[str, dict[str, Any]]:
-    """Perform statistical tests on distributions."""
+    """Perform statistical tests on distributions.
+
+    Distributions whose samples have matching lengths are stacked and tested
+    together, so each test runs as one SciPy call along the last axis.
+    """
+    dist_names = [
+        name
+        for name in ["out_degrees", "in_degrees", "weights"]
+        if name in full_dist and name in sub_dist
+    ]
+
+    # Limit sample size for tests (use random sampling if too large)
+    max_samples = 10000
+    rng = np.random.default_rng()
+    samples = {}
+    groups = defaultdict(list)
+    for dist_name in dist_names:
+        full_data = _limit_samples(np.asarray(full_dist[dist_name]), max_samples, rng)
+        sub_data = _limit_samples(np.asarray(sub_dist[dist_name]), max_samples, rng)
+        samples[dist_name] = (full_data, sub_data)
+        groups[len(full_data), len(sub_data)].append(dist_name)
+
     results = {}
+    # The three tests are independent and spend their time in NumPy sorting/ranking,
+    # which releases the GIL, so each group's tests run side by side on threads
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        for group in groups.values():
+            full_stack = np.stack([samples[name][0] for name in group]).astype(np.float64)
+            sub_stack = np.stack([samples[name][1] for name in group]).astype(np.float64)
+
+            # Kolmogorov-Smirnov test for distribution similarity
+            ks_future = executor.submit(stats.ks_2samp, full_stack, sub_stack, axis=-1)
+
+            # Mann-Whitney U test for central tendency
+            mw_future = executor.submit(
+                stats.mannwhitneyu,
+                full_stack,
+                sub_stack,
+                alternative="two-sided",
+                axis=-1,
+            )
 
-    for dist_name in ["out_degrees", "in_degrees", "weights"]:
-        if dist_name not in full_dist or dist_name not in sub_dist:
-            continue
-
-        full_data = np.array(full_dist[dist_name])
-        sub_data = np.array(sub_dist[dist_name])
-
-        # Limit sample size for tests (use random sampling if too large)
-        max_samples = 10000
-        if len(full_data) > max_samples:
-            full_data = np.random.choice(full_data, max_samples, replace=False)
-        if len(sub_data) > max_samples:
-            sub_data = np.random.choice(sub_data, max_samples, replace=False)
-
-        # Kolmogorov-Smirnov test for distribution similarity
-        ks_stat, ks_pval = stats.ks_2samp(full_data, sub_data)
-
-        # Mann-Whitney U test for central tendency
-        mw_stat, mw_pval = stats.mannwhitneyu(full_data, sub_data, alternative="two-sided")
-
-        # Levene's test for variance equality
-        lev_stat, lev_pval = stats.levene(full_data, sub_data)
-
-        # Effect size (Cohen's d)
-        pooled_std = np.sqrt((np.std(full_data) ** 2 + np.std(sub_data) ** 2) / 2)
-        cohens_d = abs(np.mean(full_data) - np.mean(sub_data)) / pooled_std if pooled_std > 0 else 0
-
-        results[dist_name] = {
-            "ks_test": {
-                "statistic": float(ks_stat),
-                "p_value": float(ks_pval),
-                "significant": ks_pval < 0.05,
-                "interpretation": "Distributions differ"
-                if ks_pval < 0.05
-                else "Distributions similar",
-            },
-            "mann_whitney": {
-                "statistic": float(mw_stat),
-                "p_value": float(mw_pval),
-                "significant": mw_pval < 0.05,
-                "interpretation": "Central tendencies differ"
-                if mw_pval < 0.05
-                else "Central tendencies similar",
-            },
-            "levene": {
-                "statistic": float(lev_stat),
-                "p_value": float(lev_pval),
-                "significant": lev_pval < 0.05,
-                "interpretation": "Variances differ" if lev_pval < 0.05 else "Variances similar",
-            },
-            "effect_size": {
-                "cohens_d": float(cohens_d),
-                "interpretation": (
-                    "Negligible"
-                    if cohens_d < 0.2
-                    else "Small"
-                    if cohens_d < 0.5
-                    else "Medium"
-                    if cohens_d < 0.8
-                    else "Large"
-                ),
-            },
-        }
+            # Levene's test for variance equality
+            lev_future = executor.submit(stats.levene, full_stack, sub_stack, axis=-1)
+
+            # Effect size (Cohen's d)
+            full_mean = np.mean(full_stack, axis=-1)
+            sub_mean = np.mean(sub_stack, axis=-1)
+            pooled_std = np.sqrt((np.var(full_stack, axis=-1) + np.var(sub_stack, axis=-1)) / 2)
+            mean_diff = np.abs(full_mean - sub_mean)
+            cohens_d = np.divide(
+                mean_diff,
+                pooled_std,
+                out=np.zeros_like(mean_diff),
+                where=pooled_std > 0,
+            )
 
-    return results
+            ks_stat, ks_pval = ks_future.result()
+            mw_stat, mw_pval = mw_future.result()
+            lev_stat, lev_pval = lev_future.result()
+
+            for i, dist_name in enumerate(group):
+                results[dist_name] = {
+                    "ks_test": {
+                        "statistic": float(ks_stat[i]),
+                        "p_value": float(ks_pval[i]),
+                        "significant": bool(ks_pval[i] < 0.05),
+                        "interpretation": _interpret_test(
+                            ks_pval[i],
+                            "Distributions differ",
+                            "Distributions similar",
+                        ),
+                    },
+                    "mann_whitney": {
+                        "statistic": float(mw_stat[i]),
+                        "p_value": float(mw_pval[i]),
+                        "significant": bool(mw_pval[i] < 0.05),
+                        "interpretation": _interpret_test(
+                            mw_pval[i],
+                            "Central tendencies differ",
+                            "Central tendencies similar",
+                        ),
+                    },
+                    "levene": {
+                        "statistic": float(lev_stat[i]),
+                        "p_value": float(lev_pval[i]),
+                        "significant": bool(lev_pval[i] < 0.05),
+                        "interpretation": _interpret_test(
+                            lev_pval[i],
+                            "Variances differ",
+                            "Variances similar",
+                        ),
+                    },
+                    "effect_size": {
+                        "cohens_d": float(cohens_d[i]),
+                        "interpretation": (
+                            "Negligible"
+                            if cohens_d[i] < 0.2
+                            else "Small"
+                            if cohens_d[i] < 0.5
+                            else "Medium"
+                            if cohens_d[i] < 0.8
+                            else "Large"
+                        ),
+                    },
+                }
+
+    return {dist_name: results[dist_name] for dist_name in dist_names}
 
 
 def display_dataset_size_comparison(
@@ -172,8 +259,13 @@ def display_degree_distribution_comparison(
             "differences": {},
         }
 
-        for stat in ["mean", "median", "std", "gini"]:
-            diff = calculate_relative_difference(full_deg[stat], sub_deg[stat])
+        stat_names = ["mean", "median", "std", "gini"]
+        diffs = calculate_relative_differences(
+            [full_deg[stat] for stat in stat_names],
+            [sub_deg[stat] for stat in stat_names],
+        )
+
+        for stat, diff in zip(stat_names, diffs, strict=True):
             comparison[degree_type]["differences"][stat] = diff
 
             table.add_row(
@@ -247,8 +339,13 @@ def display_power_law_comparison(
 
             comparison["differences"][fit_type] = {}
 
-            for metric in ["alpha", "r_squared"]:
-                diff = calculate_relative_difference(full_fit[metric], sub_fit[metric])
+            fit_metrics = ["alpha", "xmin", "ks_statistic"]
+            diffs = calculate_relative_differences(
+                [full_fit[metric] for metric in fit_metrics],
+                [sub_fit[metric] for metric in fit_metrics],
+            )
+
+            for metric, diff in zip(fit_metrics, diffs, strict=True):
                 comparison["differences"][fit_type][metric] = diff
 
                 table.add_row(
@@ -283,8 +380,13 @@ def display_other_metrics_comparison(
         "differences": {},
     }
 
-    for metric in ["density", "reciprocity"]:
-        diff = calculate_relative_difference(full_basic[metric], sub_basic[metric])
+    metrics = ["density", "reciprocity"]
+    diffs = calculate_relative_differences(
+        [full_basic[metric] for metric in metrics],
+        [sub_basic[metric] for metric in metrics],
+    )
+
+    for metric, diff in zip(metrics, diffs, strict=True):
         comparison["differences"][metric] = diff
 
         table.add_row(
@@ -307,23 +409,13 @@ def calculate_representativeness_assessment(
 
     full_basic = full_metrics["basic_metrics"]
     sub_basic = sub_metrics["basic_metrics"]
+    full_out = full_metrics["degree_stats"]["out_degree"]
+    sub_out = sub_metrics["degree_stats"]["out_degree"]
 
     key_metrics = [
-        (
-            "degree_mean",
-            full_metrics["degree_stats"]["out_degree"]["mean"],
-            sub_metrics["degree_stats"]["out_degree"]["mean"],
-        ),
-        (
-            "degree_std",
-            full_metrics["degree_stats"]["out_degree"]["std"],
-            sub_metrics["degree_stats"]["out_degree"]["std"],
-        ),
-        (
-            "degree_gini",
-            full_metrics["degree_stats"]["out_degree"]["gini"],
-            sub_metrics["degree_stats"]["out_degree"]["gini"],
-        ),
+        ("degree_mean", full_out["mean"], sub_out["mean"]),
+        ("degree_std", full_out["std"], sub_out["std"]),
+        ("degree_gini", full_out["gini"], sub_out["gini"]),
         ("reciprocity", full_basic["reciprocity"], sub_basic["reciprocity"]),
     ]
 
@@ -337,13 +429,11 @@ def calculate_representativeness_assessment(
             )
         )
 
-    differences = []
+    names, full_values, sub_values = zip(*key_metrics, strict=True)
+    differences = calculate_relative_differences(full_values, sub_values)
     assessment_details = []
 
-    for name, full_val, sub_val in key_metrics:
-        diff = calculate_relative_difference(full_val, sub_val)
-        differences.append(diff)
-
+    for name, diff in zip(names, differences, strict=True):
         status = "✅" if diff < 10 else "⚠️" if diff < 20 else "❌"
         console.print(f"  {status} {name}: {diff:.1f}% difference")
         assessment_details.append(
@@ -376,22 +466,20 @@ def calculate_representativeness_assessment(
     }
 
 
-def convert_numpy_types(obj: object) -> object:
-    """Convert numpy types to native Python types for JSON serialization."""
+def json_default(obj: object) -> object:
+    """Convert numpy types to native Python types as json.dump encounters them."""
     type_converters = {
         np.bool_: bool,
         np.integer: int,
         np.floating: float,
         np.ndarray: lambda x: x.tolist(),
-        dict: lambda x: {key: convert_numpy_types(value) for key, value in x.items()},
-        list: lambda x: [convert_numpy_types(item) for item in x],
     }
 
     for type_check, converter in type_converters.items():
         if isinstance(obj, type_check):
             return converter(obj)
 
-    return obj
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
 def compare_metrics(
@@ -436,8 +524,7 @@ def compare_metrics(
         sub_metrics,
     )
 
-    # Convert all numpy types to native Python types for JSON serialization
-    return convert_numpy_types(comparison_results)
+    return comparison_results
 
 
 def main() -> None:
@@ -489,19 +576,19 @@ def main() -> None:
         "_metrics",
         "_distributions",
     ).replace("graph", "graph_distributions")
-    if not full_dist_path.with_suffix(".pkl.gz").exists():
-        full_dist_path = full_metrics_path.parent / "graph_distributions.pkl.gz"
+    if not full_dist_path.with_suffix(".npz").exists():
+        full_dist_path = full_metrics_path.parent / "graph_distributions.npz"
     else:
-        full_dist_path = full_dist_path.with_suffix(".pkl.gz")
+        full_dist_path = full_dist_path.with_suffix(".npz")
 
     sub_dist_path = sub_metrics_path.parent / sub_metrics_path.stem.replace(
         "_metrics",
         "_distributions",
     )
-    if not sub_dist_path.with_suffix(".pkl.gz").exists():
-        sub_dist_path = sub_metrics_path.parent / "subgraph_distributions.pkl.gz"
+    if not sub_dist_path.with_suffix(".npz").exists():
+        sub_dist_path = sub_metrics_path.parent / "subgraph_distributions.npz"
     else:
-        sub_dist_path = sub_dist_path.with_suffix(".pkl.gz")
+        sub_dist_path = sub_dist_path.with_suffix(".npz")
 
     if full_dist_path.exists() and sub_dist_path.exists():
         console.print("[cyan]Loading distribution data for statistical tests...")
@@ -520,7 +607,7 @@ def main() -> None:
     output_path = args.output
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with output_path.open("w") as f:
-        json.dump(comparison_results, f, indent=2)
+        json.dump(comparison_results, f, indent=2, default=json_default)
 
     console.print(f"\n[green]✅ Comparison results saved to: {output_path}")
     console.print("\n[green]✨ Comparison complete!")
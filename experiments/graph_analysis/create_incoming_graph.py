@@ -1,167 +1,337 @@
 #!/usr/bin/env python3
 """Create graph where each node only has incoming edges (who points TO them)."""
 
-import json
+import argparse
+import mmap
+import shutil
 import struct
-from collections import defaultdict
+from collections.abc import Callable, Iterator
 from pathlib import Path
 from uuid import UUID
 
+import numpy as np
+import orjson
 from rich.console import Console
 from rich.progress import BarColumn, Progress, SpinnerColumn, TextColumn
 
 console = Console()
 
+# graph.bin node layout: 16-byte UUID + u32 count, then count * (16-byte UUID + f32 weight)
+HEADER_STRUCT = struct.Struct("<16sI")
+EDGE_DTYPE = np.dtype([("uuid", "V16"), ("weight", "<f4")])
+HEADER_DTYPE = np.dtype([("uuid", "V16"), ("count", "<u4")])
 
-def create_incoming_only_graph() -> (Path, Path):
+# Pass 1 records, partitioned into buckets by the target's first byte and kept on disk
+# under a directory keyed by graph.bin's size and mtime so reruns can skip pass 1
+BUCKET_DTYPE = np.dtype([("target", "V16"), ("source", "V16"), ("weight", "<f4")])
+NUM_BUCKETS = 256
+BUCKET_CACHE_PREFIX = ".incoming_buckets_"
+BUCKET_COUNTS_FILE = "counts.npz"
+PARTITION_BATCH_EDGES = 1 << 20
+PROGRESS_INTERVAL = 500000
+MAX_INCOMING_EDGES = 250
+
+
+def iter_graph_nodes(buffer: mmap.mmap) -> Iterator[tuple[bytes, np.ndarray]]:
+    """Yield (source UUID bytes, edge records) for each node in a graph.bin buffer.
+
+    Edge records are zero-copy EDGE_DTYPE views into the buffer. A truncated
+    trailing node yields only its complete edges.
+    """
+    size = len(buffer)
+    offset = 0
+    while offset + HEADER_STRUCT.size <= size:
+        source_bytes, num_connections = HEADER_STRUCT.unpack_from(buffer, offset)
+        offset += HEADER_STRUCT.size
+        count = min(num_connections, (size - offset) // EDGE_DTYPE.itemsize)
+        yield source_bytes, np.frombuffer(buffer, dtype=EDGE_DTYPE, count=count, offset=offset)
+        offset += num_connections * EDGE_DTYPE.itemsize
+
+
+def argsort_uuids(uuids: np.ndarray) -> np.ndarray:
+    """Stable argsort of 16-byte UUIDs in byte order.
+
+    Sorts on two big-endian uint64 halves, which is about twice as fast as
+    numpy's generic comparison sort on void dtypes and gives the same order.
+    """
+    halves = np.ascontiguousarray(uuids).view(">u8").reshape(-1, 2)
+    return np.lexsort((halves[:, 1], halves[:, 0]))
+
+
+def top_weight_indices(weights: np.ndarray, k: int) -> np.ndarray:
+    """Return indices of the k largest weights, heaviest first.
+
+    Uses a partial partition instead of a full sort; equal weights keep their
+    original order, matching a stable descending sort truncated to k.
+    """
+    if len(weights) > k:
+        threshold = np.partition(weights, len(weights) - k)[len(weights) - k]
+        above = np.flatnonzero(weights > threshold)
+        ties = np.flatnonzero(weights == threshold)[: k - len(above)]
+        candidates = np.sort(np.concatenate((above, ties)))
+    else:
+        candidates = np.arange(len(weights))
+    return candidates[np.argsort(-weights[candidates], kind="stable")]
+
+
+def _write_partition_batch(
+    bucket_files: list,
+    sources: list[bytes],
+    edge_blocks: list[np.ndarray],
+) -> None:
+    """Invert a batch of nodes' edges and append them to the target buckets."""
+    edges = np.concatenate(edge_blocks)
+    records = np.empty(len(edges), dtype=BUCKET_DTYPE)
+    records["target"] = edges["uuid"]
+    records["source"] = np.repeat(
+        np.array(sources, dtype="V16"),
+        [len(block) for block in edge_blocks],
+    )
+    records["weight"] = edges["weight"]
+
+    # First target byte selects the bucket; a stable sort keeps each bucket in scan order
+    bucket_ids = records.view(np.uint8).reshape(len(records), BUCKET_DTYPE.itemsize)[:, 0]
+    order = np.argsort(bucket_ids, kind="stable")
+    records = records[order]
+    bounds = np.searchsorted(bucket_ids[order], np.arange(NUM_BUCKETS + 1))
+    for bucket, (start, end) in enumerate(zip(bounds[:-1], bounds[1:], strict=True)):
+        if start < end:
+            bucket_files[bucket].write(records[start:end].tobytes())
+
+
+def bucket_file_paths(bucket_dir: Path) -> list[Path]:
+    """Return the bucket file paths in target order."""
+    return [bucket_dir / f"bucket_{bucket:03d}.bin" for bucket in range(NUM_BUCKETS)]
+
+
+def partition_edges_by_target(
+    buffer: mmap.mmap,
+    bucket_dir: Path,
+    on_progress: Callable[[int], None] | None = None,
+) -> list[Path]:
+    """Write every edge of graph.bin as a (target, source, weight) record into bucket files.
+
+    Buckets are keyed by the first byte of the target UUID, so each bucket holds
+    all incoming edges of its targets and bucket order follows target order.
+    on_progress is called with the number of nodes read every PROGRESS_INTERVAL nodes.
+    """
+    bucket_paths = bucket_file_paths(bucket_dir)
+    bucket_files = [path.open("wb") for path in bucket_paths]
+    try:
+        sources: list[bytes] = []
+        edge_blocks: list[np.ndarray] = []
+        batch_edges = 0
+        for nodes_processed, (source_bytes, edges) in enumerate(iter_graph_nodes(buffer), 1):
+            if on_progress and nodes_processed % PROGRESS_INTERVAL == 0:
+                on_progress(nodes_processed)
+            if not len(edges):
+                continue
+            sources.append(source_bytes)
+            edge_blocks.append(edges)
+            batch_edges += len(edges)
+            if batch_edges >= PARTITION_BATCH_EDGES:
+                _write_partition_batch(bucket_files, sources, edge_blocks)
+                sources, edge_blocks, batch_edges = [], [], 0
+        if edge_blocks:
+            _write_partition_batch(bucket_files, sources, edge_blocks)
+    finally:
+        for f in bucket_files:
+            f.close()
+    return bucket_paths
+
+
+def count_bucket_targets(bucket_path: Path) -> tuple[np.ndarray, np.ndarray]:
+    """Return the sorted distinct targets in a bucket file and their incoming edge counts."""
+    if bucket_path.stat().st_size == 0:
+        return np.empty(0, dtype="V16"), np.empty(0, dtype=np.int64)
+    records = np.memmap(bucket_path, dtype=BUCKET_DTYPE, mode="r")
+    return np.unique(records["target"], return_counts=True)
+
+
+def save_bucket_counts(
+    counts_path: Path,
+    bucket_counts: list[tuple[np.ndarray, np.ndarray]],
+) -> None:
+    """Save every bucket's targets and counts to one .npz file."""
+    np.savez(
+        counts_path,
+        targets=np.concatenate([targets for targets, _ in bucket_counts]),
+        counts=np.concatenate([counts for _, counts in bucket_counts]),
+        bucket_sizes=np.array([len(targets) for targets, _ in bucket_counts]),
+    )
+
+
+def load_bucket_counts(counts_path: Path) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Load per-bucket targets and counts saved by save_bucket_counts."""
+    with np.load(counts_path) as data:
+        splits = np.cumsum(data["bucket_sizes"])[:-1]
+        return list(
+            zip(
+                np.split(data["targets"], splits),
+                np.split(data["counts"], splits),
+                strict=True,
+            ),
+        )
+
+
+def create_incoming_only_graph(*, keep_buckets: bool = True) -> (Path, Path):
     """Create a graph where each node only has its incoming edges.
 
-    Memory-efficient two-pass approach:
-    1. Count incoming edges per node
-    2. Write files directly without storing all edges in memory
+    Memory-efficient two-pass approach over on-disk buckets of edges grouped by target:
+    1. Scan graph.bin once, partition edges into buckets and count incoming edges per node
+       (skipped when buckets for the same graph.bin size and mtime are already on disk)
+    2. Write each bucket without storing all edges in memory
+
+    The buckets take about twice the size of graph.bin; with keep_buckets=False they are
+    deleted once the output files are written.
     """
 
     console.print("[bold cyan]Creating Incoming-Only Graph (Memory Efficient)[/bold cyan]")
-    console.print("Pass 1: Count incoming edges per node")
-    console.print("Pass 2: Write output files directly")
+    console.print("Pass 1: Bucket edges by target and count incoming edges per node")
+    console.print("Pass 2: Write output files bucket by bucket")
 
     input_path = Path("../../data/graph.bin")
-
-    # Pass 1: Count incoming edges for each node
-    console.print("\n[cyan]Pass 1: Counting incoming edges...")
-    incoming_counts = defaultdict(int)
-    nodes_processed = 0
-    total_edges = 0
-
-    with input_path.open("rb") as f:
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            console=console,
-        ) as progress:
-            task = progress.add_task("Counting...", total=None)
-
-            while True:
-                uuid_bytes = f.read(16)
-                if not uuid_bytes or len(uuid_bytes) < 16:
-                    break
-
-                source_id = str(UUID(bytes=uuid_bytes))
-
-                conn_count_bytes = f.read(4)
-                if not conn_count_bytes:
-                    break
-                num_connections = struct.unpack("<I", conn_count_bytes)[0]
-
-                # Count incoming edges for each target
-                for _ in range(num_connections):
-                    neighbor_uuid_bytes = f.read(16)
-                    weight_bytes = f.read(4)
-                    if len(neighbor_uuid_bytes) < 16 or len(weight_bytes) < 4:
-                        break
-
-                    target_id = str(UUID(bytes=neighbor_uuid_bytes))
-                    incoming_counts[target_id] += 1
-                    total_edges += 1
-
-                nodes_processed += 1
-                if nodes_processed % 50000 == 0:
-                    progress.update(task, description=f"Counted {nodes_processed:,} nodes...")
-                    progress.advance(task)
+    output_ndjson = Path(__file__).parent / "../data/graph_incoming_only.ndjson"
+    output_binary = Path(__file__).parent / "../data/graph_incoming_only.bin"
+    largest_bucket = 0
+
+    graph_stat = input_path.stat()
+    cache_key = f"{graph_stat.st_size}_{graph_stat.st_mtime_ns}"
+    bucket_dir = output_binary.parent / f"{BUCKET_CACHE_PREFIX}{cache_key}"
+    counts_path = bucket_dir / BUCKET_COUNTS_FILE
+    bucket_paths = bucket_file_paths(bucket_dir)
+
+    if counts_path.exists():
+        console.print(f"\n[cyan]Pass 1: Reusing buckets from {bucket_dir}")
+        bucket_counts = load_bucket_counts(counts_path)
+    else:
+        # Drop buckets left by earlier versions of graph.bin or interrupted runs
+        for stale_dir in output_binary.parent.glob(f"{BUCKET_CACHE_PREFIX}*"):
+            shutil.rmtree(stale_dir)
+        bucket_dir.mkdir()
+
+        # Pass 1: One scan of graph.bin inverts every edge into its target's bucket
+        console.print(f"\n[cyan]Pass 1: Partitioning edges into {NUM_BUCKETS} buckets...")
+        with (
+            input_path.open("rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as graph_buffer,
+            Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                console=console,
+                disable=not console.is_terminal,  # No live display when output is redirected
+            ) as progress,
+        ):
+            task = progress.add_task("Partitioning...", total=None)
+
+            def report_progress(nodes_processed: int) -> None:
+                progress.update(task, description=f"Partitioned {nodes_processed:,} nodes...")
+                progress.advance(task)
+
+            partition_edges_by_target(graph_buffer, bucket_dir, report_progress)
+
+        # Count incoming edges for each target, one bucket at a time; saving the counts
+        # last marks the bucket directory as complete
+        bucket_counts = [count_bucket_targets(path) for path in bucket_paths]
+        save_bucket_counts(counts_path, bucket_counts)
+
+    in_degrees = np.concatenate([counts for _, counts in bucket_counts])
+    total_edges = int(in_degrees.sum())
 
     console.print("[green]✓ Pass 1 complete:[/green]")
-    console.print(f"  Nodes with incoming edges: {len(incoming_counts):,}")
+    console.print(f"  Nodes with incoming edges: {len(in_degrees):,}")
     console.print(f"  Total incoming edges: {total_edges:,}")
-    console.print(f"  Average per node: {total_edges / len(incoming_counts):.1f}")
+    console.print(f"  Average per node: {total_edges / len(in_degrees):.1f}")
 
     # Analyze distribution
-    in_degrees = list(incoming_counts.values())
-    import numpy as np
-
     console.print(
-        f"  In-degree stats: mean={np.mean(in_degrees):.1f}, max={max(in_degrees):,}, std={np.std(in_degrees):.1f}",
+        f"  In-degree stats: mean={np.mean(in_degrees):.1f}, max={in_degrees.max():,}, std={np.std(in_degrees):.1f}",
     )
 
-    # Pass 2: Stream through again and collect edges for each node
+    # Pass 2: Group each bucket by target and write output files
     console.print("\n[cyan]Pass 2: Creating output files...")
 
-    output_ndjson = Path(__file__).parent / "../data/graph_incoming_only.ndjson"
-    output_binary = Path(__file__).parent / "../data/graph_incoming_only.bin"
-
-    # Process in chunks to manage memory
-    chunk_size = 10000  # Process 10k target nodes at a time
-    all_targets = list(incoming_counts.keys())
-
-    with output_ndjson.open("w") as f_json, output_binary.open("wb") as f_bin:
-        for chunk_start in range(0, len(all_targets), chunk_size):
-            chunk_targets = set(all_targets[chunk_start : chunk_start + chunk_size])
-            chunk_edges = defaultdict(list)
-
-            console.print(
-                f"  Processing chunk {chunk_start // chunk_size + 1}/{(len(all_targets) - 1) // chunk_size + 1}",
-            )
-
-            # Scan entire graph for edges to this chunk's targets
-            with input_path.open("rb") as f_read:
-                while True:
-                    uuid_bytes = f_read.read(16)
-                    if not uuid_bytes or len(uuid_bytes) < 16:
-                        break
-
-                    source_id = str(UUID(bytes=uuid_bytes))
-
-                    conn_count_bytes = f_read.read(4)
-                    if not conn_count_bytes:
-                        break
-                    num_connections = struct.unpack("<I", conn_count_bytes)[0]
-
-                    for _ in range(num_connections):
-                        neighbor_uuid_bytes = f_read.read(16)
-                        weight_bytes = f_read.read(4)
-                        if len(neighbor_uuid_bytes) < 16 or len(weight_bytes) < 4:
-                            break
-
-                        target_id = str(UUID(bytes=neighbor_uuid_bytes))
-                        weight = struct.unpack("<f", weight_bytes)[0]
-
-                        # Only collect edges for targets in current chunk
-                        if target_id in chunk_targets:
-                            chunk_edges[target_id].append((source_id, weight))
-
-            # Write chunk to files
-            for target_id in sorted(chunk_targets):
-                edge_list = chunk_edges.get(target_id, [])
-
-                # Sort by weight and limit
-                edge_list.sort(key=lambda x: x[1], reverse=True)
-                limited_edges = edge_list[:250]
-
-                if limited_edges:  # Only write if node has edges
-                    # Write NDJSON
-                    connections = [[source_id, weight] for source_id, weight in limited_edges]
-                    entry = {"id": target_id, "connections": connections}
-                    f_json.write(json.dumps(entry) + "\n")
-
-                    # Write binary
-                    f_bin.write(UUID(target_id).bytes)
-                    f_bin.write(struct.pack("<I", len(limited_edges)))
-                    for source_id, weight in limited_edges:
-                        f_bin.write(UUID(source_id).bytes)
-                        f_bin.write(struct.pack("<f", weight))
-
-            # Clear chunk memory
-            del chunk_edges
+    with output_ndjson.open("wb") as f_json, output_binary.open("wb") as f_bin:
+        for bucket_path, (targets, counts) in zip(bucket_paths, bucket_counts, strict=True):
+            records = np.fromfile(bucket_path, dtype=BUCKET_DTYPE)
+            if not len(records):
+                continue
+            largest_bucket = max(largest_bucket, len(records))
+
+            # Group by target; the stable sort keeps each group in scan order and
+            # the pass 1 counts give the group bounds
+            records = records[argsort_uuids(records["target"])]
+            bounds = np.concatenate(([0], np.cumsum(counts)))
+
+            # Pre-size the bucket's binary output from the known in-degrees: per target
+            # one header plus its kept edges, all 20-byte records
+            kept_counts = np.minimum(counts, MAX_INCOMING_EDGES)
+            node_offsets = np.concatenate(([0], np.cumsum(kept_counts + 1)[:-1]))
+            output = np.empty(len(targets) + int(kept_counts.sum()), dtype=EDGE_DTYPE)
+            headers = output.view(HEADER_DTYPE)
+            headers["uuid"][node_offsets] = targets
+            headers["count"][node_offsets] = kept_counts
+
+            for target, start, end, offset in zip(
+                targets.tolist(),
+                bounds[:-1].tolist(),
+                bounds[1:].tolist(),
+                node_offsets.tolist(),
+                strict=True,
+            ):
+                group = records[start:end]
+
+                # Keep the heaviest edges
+                top = top_weight_indices(group["weight"], MAX_INCOMING_EDGES)
+                limited_edges = output[offset + 1 : offset + 1 + len(top)]
+                limited_edges["uuid"] = group["source"][top]
+                limited_edges["weight"] = group["weight"][top]
+
+                # Write NDJSON
+                connections = [
+                    [str(UUID(bytes=source_bytes)), weight]
+                    for source_bytes, weight in zip(
+                        limited_edges["uuid"].tolist(),
+                        limited_edges["weight"].tolist(),
+                        strict=True,
+                    )
+                ]
+                entry = {"id": str(UUID(bytes=target)), "connections": connections}
+                f_json.write(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE))
+
+            # Write binary: each header followed by its edge records in graph.bin layout
+            f_bin.write(output.data)
 
     console.print("[green]✓ Created incoming-only graph files:")
     console.print(f"  NDJSON: {output_ndjson}")
     console.print(f"  Binary: {output_binary}")
+    if keep_buckets:
+        console.print(f"  Pass 1 buckets kept for reruns in: {bucket_dir}")
+    else:
+        shutil.rmtree(bucket_dir)
+        console.print(f"  Pass 1 buckets removed: {bucket_dir}")
     console.print(
-        f"\n[yellow]Memory usage: ~{chunk_size * 250 * 40 / 1024**2:.0f}MB per chunk (vs {total_edges * 40 / 1024**3:.1f}GB naive)",
+        f"\n[yellow]Memory usage: ~{largest_bucket * BUCKET_DTYPE.itemsize / 1024**2:.0f}MB for the largest bucket (vs {total_edges * 40 / 1024**3:.1f}GB naive)",
     )
 
     return output_ndjson, output_binary
 
 
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="Create graph where each node only has incoming edges",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Delete the pass 1 buckets when finished instead of keeping them for reruns",
+    )
+    args = parser.parse_args()
+
+    create_incoming_only_graph(keep_buckets=not args.no_cache)
+
+
 if __name__ == "__main__":
-    create_incoming_only_graph()
+    main()
@@ -5,6 +5,9 @@ import argparse
 import json
 import random
 import struct
+import tempfile
+from array import array
+from collections import deque
 from pathlib import Path
 from uuid import UUID
 
@@ -20,6 +23,41 @@ SUBGRAPH_RATIO = 0.2
 DEFAULT_SEED = 456
 MAX_EDGES_PER_NODE = 250
 MAX_SEED_NODES = 1000  # Start with top 1000 nodes as potential seeds
+INDEX_DIR_PREFIX = ".subgraph_index_"
+
+
+def build_alias_table(weights: list[float]) -> tuple[list[float], list[int]]:
+    """Build a Vose alias table so neighbors can be drawn proportionally to weight in O(1).
+
+    Slot k is kept with probability prob[k] and otherwise redirects to alias[k].
+    Rows without positive total weight get a uniform table.
+    """
+    n = len(weights)
+    prob = [1.0] * n
+    alias = list(range(n))
+    total = sum(weights)
+    if total <= 0:
+        return prob, alias
+
+    scaled = [weight * n / total for weight in weights]
+    small = [k for k, p in enumerate(scaled) if p < 1.0]
+    large = [k for k, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] += scaled[less] - 1.0
+        (small if scaled[more] < 1.0 else large).append(more)
+
+    # Leftovers are full slots up to rounding, which prob already says
+    return prob, alias
+
+
+def open_index_array(path: Path, dtype: type[np.generic]) -> np.ndarray:
+    """Memory-map a flat index file (np.memmap refuses empty files)."""
+    if path.stat().st_size == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
 
 
 class StreamingSubgraphSampler:
@@ -36,30 +74,53 @@ class StreamingSubgraphSampler:
         self.target_ratio = target_ratio
         self.seed = seed if seed is not None else DEFAULT_SEED
         self.output_suffix = output_suffix
-        self.node_index = {}  # node_id -> file offset for quick lookups
+        self.node_idx = {}  # node_id -> dense index, assigned on first sight
+        self.node_ids = []  # dense index -> node_id
         self.node_degrees = {}  # Only for seed selection
+        # Adjacency index: each node's neighbors and their alias table are rows of
+        # flat memory-mapped arrays, located by edge_starts[idx] and degrees[idx]
+        self.edge_starts = np.empty(0, dtype=np.uint64)
+        self.degrees = np.empty(0, dtype=np.uint32)
+        self.neighbors = np.empty(0, dtype=np.uint32)
+        self.alias_prob = np.empty(0, dtype=np.float32)
+        self.alias_idx = np.empty(0, dtype=np.uint32)
+        self.index_dir = None
         self.total_nodes = 0
         self.target_nodes = 0
         self.sampled_nodes = set()
         random.seed(self.seed)
         np.random.seed(self.seed)
 
-    def build_index_and_find_seeds(self) -> list[str]:
-        """First pass: Build node index and identify high-degree seed nodes."""
+    def build_index_and_find_seeds(self) -> list[int]:
+        """First pass: Build adjacency index and identify high-degree seed nodes."""
         console.print("[cyan]Building index and finding seed nodes...")
 
         # Track top nodes by degree
         top_nodes = []  # [(degree, node_id)]
 
-        with self.graph_path.open() as f:
-            while True:
-                # Store position before reading
-                offset = f.tell()
-                line = f.readline()
+        # Rows are appended in file order, so remember which node owns each row
+        node_idx = self.node_idx
+        row_nodes = array("I")
+        row_starts = array("Q")
+        row_degrees = array("I")
+        n_edges = 0
 
-                if not line:  # EOF
-                    break
+        self.index_dir = tempfile.TemporaryDirectory(
+            prefix=INDEX_DIR_PREFIX,
+            dir=self.graph_path.parent,
+        )
+        index_path = Path(self.index_dir.name)
+        neighbors_path = index_path / "neighbors.bin"
+        alias_prob_path = index_path / "alias_prob.bin"
+        alias_idx_path = index_path / "alias_idx.bin"
 
+        with (
+            self.graph_path.open() as f,
+            neighbors_path.open("wb") as neighbors_f,
+            alias_prob_path.open("wb") as alias_prob_f,
+            alias_idx_path.open("wb") as alias_idx_f,
+        ):
+            for line in f:
                 if not line.strip():
                     continue
 
@@ -69,8 +130,20 @@ class StreamingSubgraphSampler:
                     connections = data["connections"][:MAX_EDGES_PER_NODE]
                     degree = len(connections)
 
-                    # Store file position for this node
-                    self.node_index[node_id] = offset
+                    neighbors = array(
+                        "I",
+                        [node_idx.setdefault(conn_id, len(node_idx)) for conn_id, _ in connections],
+                    )
+                    prob, alias = build_alias_table([weight for _, weight in connections])
+
+                    # Append this node's row to the adjacency index
+                    row_nodes.append(node_idx.setdefault(node_id, len(node_idx)))
+                    row_starts.append(n_edges)
+                    row_degrees.append(degree)
+                    neighbors.tofile(neighbors_f)
+                    array("f", prob).tofile(alias_prob_f)
+                    array("I", alias).tofile(alias_idx_f)
+                    n_edges += degree
 
                     # Track high-degree nodes for seeds
                     if len(top_nodes) < MAX_SEED_NODES:
@@ -88,9 +161,20 @@ class StreamingSubgraphSampler:
                 except (json.JSONDecodeError, KeyError) as e:
                     console.print(f"[yellow]Warning: Error parsing line: {e}")
 
+        # Neighbors without a line of their own keep an empty row
+        self.node_ids = list(node_idx)
+        self.edge_starts = np.zeros(len(self.node_ids), dtype=np.uint64)
+        self.degrees = np.zeros(len(self.node_ids), dtype=np.uint32)
+        rows = np.frombuffer(row_nodes, dtype=np.uint32)
+        self.edge_starts[rows] = np.frombuffer(row_starts, dtype=np.uint64)
+        self.degrees[rows] = np.frombuffer(row_degrees, dtype=np.uint32)
+        self.neighbors = open_index_array(neighbors_path, np.uint32)
+        self.alias_prob = open_index_array(alias_prob_path, np.float32)
+        self.alias_idx = open_index_array(alias_idx_path, np.uint32)
+
         self.target_nodes = int(self.total_nodes * self.target_ratio)
 
-        console.print(f"[green]✓ Indexed {self.total_nodes:,} nodes")
+        console.print(f"[green]✓ Indexed {self.total_nodes:,} nodes ({n_edges:,} edges)")
         console.print(
             f"[yellow]Target subgraph size: {self.target_nodes:,} nodes ({self.target_ratio:.0%})",
         )
@@ -111,36 +195,28 @@ class StreamingSubgraphSampler:
         avg_degree = np.mean([d for d, _ in top_nodes[: len(seeds)]])
         console.print(f"[cyan]Selected {len(seeds)} seed nodes (avg degree: {avg_degree:.1f})")
 
-        return seeds
-
-    def get_node_connections(self, node_id: str) -> list[tuple[str, float]]:
-        """Get connections for a specific node by seeking to its position."""
-        if node_id not in self.node_index:
-            return []
-
-        offset = self.node_index[node_id]
+        return [node_idx[node_id] for node_id in seeds]
 
-        with self.graph_path.open() as f:
-            f.seek(offset)
-            line = f.readline()
-            if not line.strip():
-                return []
+    def get_node_connections(self, node: int) -> np.ndarray:
+        """Get neighbor indices for a node as a slice of the adjacency index."""
+        start = int(self.edge_starts[node])
+        return self.neighbors[start : start + int(self.degrees[node])]
 
-            try:
-                data = json.loads(line)
-                if data["id"] == node_id:
-                    return data["connections"][:MAX_EDGES_PER_NODE]
-            except (json.JSONDecodeError, KeyError):
-                pass
-
-        return []
+    def close(self) -> None:
+        """Release the adjacency index and delete its files."""
+        self.neighbors = np.empty(0, dtype=np.uint32)
+        self.alias_prob = np.empty(0, dtype=np.float32)
+        self.alias_idx = np.empty(0, dtype=np.uint32)
+        if self.index_dir is not None:
+            self.index_dir.cleanup()
+            self.index_dir = None
 
     def random_walk_from_seed(
         self,
-        seed: str,
+        seed: int,
         walk_length: int = 20,
         n_walks: int = 100,
-    ) -> set[str]:
+    ) -> set[int]:
         """Perform multiple random walks from a seed node."""
         local_sampled = {seed}
 
@@ -149,23 +225,20 @@ class StreamingSubgraphSampler:
 
             # Random walk
             for _ in range(walk_length):
-                connections = self.get_node_connections(current)
-                if not connections:
+                degree = int(self.degrees[current])
+                if not degree:
                     break
 
                 # Choose next node based on weights
                 if random.random() < 0.15:  # 15% random restart
                     current = seed
                 else:
-                    # Weighted random selection
-                    weights = [w for _, w in connections]
-                    if sum(weights) > 0:
-                        probs = np.array(weights) / sum(weights)
-                        idx = np.random.choice(len(connections), p=probs)
-                    else:
-                        idx = random.randint(0, len(connections) - 1)
-
-                    current = connections[idx][0]
+                    # Weighted random selection: one alias table lookup
+                    slot = int(self.edge_starts[current]) + int(random.random() * degree)
+                    if random.random() >= self.alias_prob[slot]:
+                        slot = int(self.edge_starts[current]) + int(self.alias_idx[slot])
+
+                    current = int(self.neighbors[slot])
                     local_sampled.add(current)
 
                     # Don't limit per seed - we want full coverage
@@ -174,11 +247,13 @@ class StreamingSubgraphSampler:
 
         return local_sampled
 
-    def sample_nodes_streaming(self, seed_nodes: list[str]) -> set[str]:
+    def sample_nodes_streaming(self, seed_nodes: list[int]) -> np.ndarray:
         """Perform streaming random walks from seed nodes."""
         console.print("[cyan]Performing random walk sampling...")
 
-        sampled_nodes = set()
+        # Membership bitset over dense node indices
+        present = np.zeros(len(self.node_ids), dtype=np.uint8)
+        n_sampled = 0
 
         with Progress(
             SpinnerColumn(),
@@ -188,52 +263,61 @@ class StreamingSubgraphSampler:
         ) as progress:
             task = progress.add_task("Random walks...", total=len(seed_nodes))
 
-            for seed in seed_nodes:
+            for i, seed in enumerate(seed_nodes):
                 # Random walk from this seed
-                local_sampled = self.random_walk_from_seed(seed)
-                sampled_nodes.update(local_sampled)
+                local_sampled = np.fromiter(self.random_walk_from_seed(seed), dtype=np.int64)
+                n_sampled += int(np.count_nonzero(present[local_sampled] == 0))
+                present[local_sampled] = 1
 
                 progress.advance(task)
 
                 # Stop if we have enough nodes
-                if len(sampled_nodes) >= self.target_nodes:
+                if n_sampled >= self.target_nodes:
                     break
 
                 # Memory management
-                if len(seed_nodes) > 0 and seed_nodes.index(seed) % 50 == 0:
-                    console.print(f"  Sampled {len(sampled_nodes):,} nodes so far...")
+                if i % 50 == 0:
+                    console.print(f"  Sampled {n_sampled:,} nodes so far...")
 
         # If we don't have enough nodes, do BFS from existing nodes
-        if len(sampled_nodes) < self.target_nodes * 0.9:  # Less than 90% of target
+        if n_sampled < self.target_nodes * 0.9:  # Less than 90% of target
             console.print("[yellow]Need more nodes. Using BFS to reach target...")
 
             # BFS expansion from existing sampled nodes
-            frontier = list(sampled_nodes)
+            frontier = np.flatnonzero(present).tolist()
             random.shuffle(frontier)
+            frontier = deque(frontier)
 
-            while len(sampled_nodes) < self.target_nodes and frontier:
-                current = frontier.pop(0)
-                connections = self.get_node_connections(current)
+            while n_sampled < self.target_nodes and frontier:
+                current = frontier.popleft()
+                neighbors = self.get_node_connections(current)
 
-                for conn_id, _ in connections[:10]:  # Sample up to 10 neighbors
-                    if conn_id not in sampled_nodes:
-                        sampled_nodes.add(conn_id)
-                        frontier.append(conn_id)
+                for conn in neighbors[:10].tolist():  # Sample up to 10 neighbors
+                    if not present[conn]:
+                        present[conn] = 1
+                        n_sampled += 1
+                        frontier.append(conn)
 
-                        if len(sampled_nodes) >= self.target_nodes:
+                        if n_sampled >= self.target_nodes:
                             break
 
+        sampled_nodes = np.flatnonzero(present)
+
         # Trim to exact target size
         if len(sampled_nodes) > self.target_nodes:
-            sampled_nodes = set(list(sampled_nodes)[: self.target_nodes])
+            sampled_nodes = np.sort(
+                np.random.choice(sampled_nodes, self.target_nodes, replace=False),
+            )
 
         console.print(f"[green]✓ Sampled {len(sampled_nodes):,} nodes")
         return sampled_nodes
 
-    def extract_subgraph_streaming(self, sampled_nodes: set[str]) -> None:  # noqa: PLR0915
+    def extract_subgraph_streaming(self, sampled_nodes: np.ndarray) -> None:  # noqa: PLR0915
         """Extract and save subgraph with only sampled nodes."""
         console.print("[cyan]Extracting and saving subgraph...")
 
+        sampled_ids = {self.node_ids[node] for node in sampled_nodes.tolist()}
+
         output_dir = Path(__file__).parent / "../data"
         output_dir.mkdir(exist_ok=True, parents=True)
 
@@ -259,7 +343,7 @@ class StreamingSubgraphSampler:
                     data = json.loads(line)
                     node_id = data["id"]
 
-                    if node_id not in sampled_nodes:
+                    if node_id not in sampled_ids:
                         continue
 
                     # Filter connections to only sampled nodes
@@ -267,7 +351,7 @@ class StreamingSubgraphSampler:
                     filtered_connections = [
                         (conn_id, weight)
                         for conn_id, weight in original_connections
-                        if conn_id in sampled_nodes
+                        if conn_id in sampled_ids
                     ]
 
                     total_edges_original += len(original_connections)
@@ -377,7 +461,7 @@ def main() -> None:
     console.print("[bold cyan]Streaming Subgraph Creator")
     console.print(f"Random seed: {args.seed}")
     console.print("Following KGTuner methodology: 20% multi-start random walk sampling")
-    console.print("[yellow]Memory-efficient: Uses file seeking instead of loading graph")
+    console.print("[yellow]Memory-efficient: Walks a memory-mapped index instead of loading graph")
     console.print("")
 
     # Create sampler
@@ -388,14 +472,17 @@ def main() -> None:
         output_suffix=args.output_suffix,
     )
 
-    # Build index and find seed nodes
-    seed_nodes = sampler.build_index_and_find_seeds()
+    try:
+        # Build index and find seed nodes
+        seed_nodes = sampler.build_index_and_find_seeds()
 
-    # Sample nodes using streaming random walks
-    sampled_nodes = sampler.sample_nodes_streaming(seed_nodes)
+        # Sample nodes using streaming random walks
+        sampled_nodes = sampler.sample_nodes_streaming(seed_nodes)
 
-    # Extract and save subgraph
-    sampler.extract_subgraph_streaming(sampled_nodes)
+        # Extract and save subgraph
+        sampler.extract_subgraph_streaming(sampled_nodes)
+    finally:
+        sampler.close()
 
     console.print("\n[green]✨ Subgraph creation complete!")
     console.print("\n[yellow]Next steps:")
@@ -23,9 +23,7 @@ jupyter: python3
 
 # %%
 # | label: setup
-import gzip
 import json
-import pickle
 import warnings
 from pathlib import Path
 
@@ -43,17 +41,17 @@ setup_custom_template()
 
 # Load data
 METRICS_PATH = Path("results/metrics/graph_metrics.json")
-DIST_PATH = Path("results/metrics/graph_distributions.pkl.gz")
+DIST_PATH = Path("results/metrics/graph_distributions.npz")
 SAMPLE_PATH = Path("results/metrics/graph_distributions_sample.json")
 
 # Load metrics
 with METRICS_PATH.open() as f:
     metrics = json.load(f)
 
-# Load distributions (try pickle first, fall back to JSON)
+# Load distributions (try NumPy archive first, fall back to JSON)
 try:
-    with gzip.open(DIST_PATH, "rb") as f:
-        distributions = pickle.load(f)
+    with np.load(DIST_PATH) as data:
+        distributions = {name: data[name] for name in data.files}
 except Exception:
     with SAMPLE_PATH.open() as f:
         distributions = json.load(f)
@@ -319,7 +317,8 @@ if "out_degree_fit" in power_law_fits:
     )
 
     # Add annotations
-    annotation_text = f"R² = {fit['r_squared']:.4f}<br>"
+    annotation_text = f"KS = {fit['ks_statistic']:.4f}<br>"
+    annotation_text += f"k<sub>min</sub> = {fit['xmin']}<br>"
     annotation_text += f"α = {fit['alpha']:.4f}"
 
     fig.add_annotation(
@@ -380,7 +379,8 @@ if "in_degree_fit" in power_law_fits:
     )
 
     # Add annotations
-    annotation_text = f"R² = {fit['r_squared']:.4f}<br>"
+    annotation_text = f"KS = {fit['ks_statistic']:.4f}<br>"
+    annotation_text += f"k<sub>min</sub> = {fit['xmin']}<br>"
     annotation_text += f"α = {fit['alpha']:.4f}"
 
     fig.add_annotation(